@@ -5,6 +5,8 @@ import json
 import re
 import requests
 from config import GEMINI_API_KEY, GEMINI_API_URL, MAX_REVIEWS_TO_ANALYZE
+from provider_limits import provider_slot
+from reviews import review_prompt_lines
 
 
 def extract_from_text(content):
@@ -41,14 +43,89 @@ def extract_from_text(content):
     return result
 
 
+def parse_ai_response(content):
+    """Parse the model's text into the analysis dict, repairing truncated JSON if needed"""
+    # Clean the content first
+    json_content = content.strip()
+    
+    # Remove markdown code blocks
+    if "```json" in json_content:
+        json_content = json_content.split("```json")[1].split("```")[0]
+    elif "```" in json_content:
+        parts = json_content.split("```")
+        if len(parts) >= 2:
+            json_content = parts[1]
+    
+    json_content = json_content.strip()
+    
+    # Try to find JSON object using regex
+    json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', json_content, re.DOTALL)
+    if json_match:
+        json_content = json_match.group(0)
+    
+    try:
+        ai_analysis = json.loads(json_content)
+    except (json.JSONDecodeError, RecursionError) as je:
+        # Runaway nesting overflows the decoder instead of failing to parse
+        print(f"   ⚠️ JSON decode error: {je}. Attempting to fix...")
+        
+        # Try aggressive JSON repair
+        fixed_json = json_content
+        
+        # Remove any trailing incomplete content after last complete value
+        # Find the last complete key-value pair
+        last_complete = max(
+            fixed_json.rfind('"],'),
+            fixed_json.rfind('"],'),
+            fixed_json.rfind('"}'),
+            fixed_json.rfind('],'),
+            fixed_json.rfind(': 0'),
+            fixed_json.rfind(': 1'),
+        )
+        
+        if last_complete > 0:
+            fixed_json = fixed_json[:last_complete + 1]
+        
+        # Close any open structures
+        open_brackets = fixed_json.count('[') - fixed_json.count(']')
+        open_braces = fixed_json.count('{') - fixed_json.count('}')
+        fixed_json = fixed_json + (']' * max(0, open_brackets)) + ('}' * max(0, open_braces))
+        
+        try:
+            ai_analysis = json.loads(fixed_json)
+        except:
+            # Ultimate fallback: extract info from text using patterns
+            print("   ⚠️ JSON repair failed. Using text extraction fallback...")
+            ai_analysis = extract_from_text(content)
+    
+    # Validate required fields
+    required_fields = ["assessment", "concerns", "positives", "recommendations", "confidence_score"]
+    for field in required_fields:
+        if field not in ai_analysis:
+            if field in ["concerns", "positives", "recommendations"]:
+                ai_analysis[field] = []
+            elif field == "confidence_score":
+                ai_analysis[field] = 50  # Default to 50 instead of 0
+            else:
+                ai_analysis[field] = "Moderate"  # Default assessment
+    
+    # Ensure confidence_score is a number
+    if isinstance(ai_analysis.get("confidence_score"), str):
+        try:
+            ai_analysis["confidence_score"] = int(ai_analysis["confidence_score"])
+        except:
+            ai_analysis["confidence_score"] = 50
+    
+    return ai_analysis
+
+
 def analyze_with_genai(all_reviews, place_data, infrastructure):
     """Use Google Gemini AI to analyze reviews and provide safety insights"""
     
     # Prepare review text for AI analysis - limit to avoid token overflow
-    review_texts = "\n".join([
-        f"[{r['source']}] {r.get('rating', 'N/A')}/5 - {r['text'][:150]}"
-        for r in all_reviews[:15]  # Max 15 reviews total for AI
-    ])
+    review_texts = "\n".join(
+        review_prompt_lines(all_reviews, limit=15, width=150)  # Max 15 reviews total for AI
+    )
     
     # Build prompt carefully to avoid JSON issues
     hotel_name = place_data.get('name', 'Unknown Hotel')
@@ -123,7 +200,8 @@ Respond with ONLY the JSON object, no explanation or markdown."""
     
     try:
         url = f"{GEMINI_API_URL}?key={GEMINI_API_KEY}"
-        response = requests.post(url, headers=headers, json=payload, timeout=60)  # Increased timeout
+        with provider_slot("gemini"):
+            response = requests.post(url, headers=headers, json=payload, timeout=60)  # Increased timeout
         
         if response.status_code == 200:
             gemini_response = response.json()
@@ -131,79 +209,7 @@ Respond with ONLY the JSON object, no explanation or markdown."""
             # Extract text from Gemini response
             try:
                 content = gemini_response["candidates"][0]["content"]["parts"][0]["text"]
-                
-                # Clean the content first
-                json_content = content.strip()
-                
-                # Remove markdown code blocks
-                if "```json" in json_content:
-                    json_content = json_content.split("```json")[1].split("```")[0]
-                elif "```" in json_content:
-                    parts = json_content.split("```")
-                    if len(parts) >= 2:
-                        json_content = parts[1]
-                
-                json_content = json_content.strip()
-                
-                # Try to find JSON object using regex
-                import re
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', json_content, re.DOTALL)
-                if json_match:
-                    json_content = json_match.group(0)
-                
-                try:
-                    ai_analysis = json.loads(json_content)
-                except json.JSONDecodeError as je:
-                    print(f"   ⚠️ JSON decode error: {je}. Attempting to fix...")
-                    
-                    # Try aggressive JSON repair
-                    fixed_json = json_content
-                    
-                    # Remove any trailing incomplete content after last complete value
-                    # Find the last complete key-value pair
-                    last_complete = max(
-                        fixed_json.rfind('"],'),
-                        fixed_json.rfind('"],'),
-                        fixed_json.rfind('"}'),
-                        fixed_json.rfind('],'),
-                        fixed_json.rfind(': 0'),
-                        fixed_json.rfind(': 1'),
-                    )
-                    
-                    if last_complete > 0:
-                        fixed_json = fixed_json[:last_complete + 1]
-                    
-                    # Close any open structures
-                    open_brackets = fixed_json.count('[') - fixed_json.count(']')
-                    open_braces = fixed_json.count('{') - fixed_json.count('}')
-                    fixed_json = fixed_json + (']' * max(0, open_brackets)) + ('}' * max(0, open_braces))
-                    
-                    try:
-                        ai_analysis = json.loads(fixed_json)
-                    except:
-                        # Ultimate fallback: extract info from text using patterns
-                        print("   ⚠️ JSON repair failed. Using text extraction fallback...")
-                        ai_analysis = extract_from_text(content)
-                
-                # Validate required fields
-                required_fields = ["assessment", "concerns", "positives", "recommendations", "confidence_score"]
-                for field in required_fields:
-                    if field not in ai_analysis:
-                        if field in ["concerns", "positives", "recommendations"]:
-                            ai_analysis[field] = []
-                        elif field == "confidence_score":
-                            ai_analysis[field] = 50  # Default to 50 instead of 0
-                        else:
-                            ai_analysis[field] = "Moderate"  # Default assessment
-                
-                # Ensure confidence_score is a number
-                if isinstance(ai_analysis.get("confidence_score"), str):
-                    try:
-                        ai_analysis["confidence_score"] = int(ai_analysis["confidence_score"])
-                    except:
-                        ai_analysis["confidence_score"] = 50
-                
-                return ai_analysis
+                return parse_ai_response(content)
                 
             except Exception as parse_error:
                 print(f"Warning: Could not parse AI response - {parse_error}")
@@ -0,0 +1,179 @@
+"""
+Area-wide hotel ranking from a single Google Maps search
+"""
+from concurrent.futures import ThreadPoolExecutor
+from data_fetchers import fetch_google_maps_candidates, fetch_google_maps_reviews
+from infra_grid import get_infrastructure
+from safety_scorer import calculate_safety_score, get_safety_verdict
+from config import (
+    LOCATION, BATCH_WORKERS,
+    AREA_RANKING_TOP_K, AREA_RANKING_MAX_TOP_K, AREA_INFRA_SHARE_RADIUS_M
+)
+
+METERS_PER_DEGREE = 111320
+
+
+def infrastructure_cell(lat, lon, cell_m=AREA_INFRA_SHARE_RADIUS_M):
+    """Grid cell used to share one infrastructure lookup between nearby hotels"""
+    cell_deg = cell_m / METERS_PER_DEGREE
+    return round(lat / cell_deg), round(lon / cell_deg)
+
+
+def _coordinates(place_data):
+    """(lat, lon) of a candidate, or None when Maps returned no coordinates"""
+    coordinates = place_data.get("coordinates") or {}
+    if coordinates.get("latitude") is None or coordinates.get("longitude") is None:
+        return None
+    return coordinates["latitude"], coordinates["longitude"]
+
+
+def fetch_shared_infrastructure(candidates):
+    """
+    Fetch infrastructure once per grid cell and assign it to every candidate
+    in that cell. Candidates must have coordinates.
+    Returns (list of infrastructure dicts, number of lookups).
+    """
+    cells = {}
+    for place_data in candidates:
+        lat, lon = _coordinates(place_data)
+        cells.setdefault(infrastructure_cell(lat, lon), (lat, lon))
+
+    print(f"\n🏗️ Fetching infrastructure for {len(cells)} area cell(s)...")
+    cell_infrastructure = {
+        cell: get_infrastructure(lat, lon)
+        for cell, (lat, lon) in cells.items()
+    }
+
+    return [
+        cell_infrastructure[infrastructure_cell(*_coordinates(place_data))]
+        for place_data in candidates
+    ], len(cells)
+
+
+def rank_area(query, location_bias=LOCATION, top_k=AREA_RANKING_TOP_K):
+    """
+    Rank every hotel returned by one Maps search for an area.
+    All candidates get a cheap first-pass score (rating + shared infrastructure);
+    only the top_k are fully analyzed with reviews and AI. Candidates without
+    coordinates get no infrastructure or score and are listed last.
+    Returns a ranking dictionary.
+    """
+    from main import analyze_place
+
+    # Every shortlisted hotel costs paid upstream calls; never let top_k be unbounded
+    if not 0 <= top_k <= AREA_RANKING_MAX_TOP_K:
+        raise ValueError(f"top_k must be between 0 and {AREA_RANKING_MAX_TOP_K}")
+
+    print(f"🗺️ Ranking hotels for: {query}")
+    print("="*60)
+
+    try:
+        candidates = fetch_google_maps_candidates(query, location_bias)
+    except Exception as e:
+        error_msg = f"Error fetching Google Maps data: {e}"
+        print(f"   ✗ {error_msg}")
+        return {"error": error_msg}
+
+    candidates = [c for c in candidates if c.get("name")]
+    print(f"   ✓ Found {len(candidates)} candidate hotels")
+    if not candidates:
+        return {"error": f"No hotels found for '{query}'"}
+
+    # Without coordinates we cannot tell which infrastructure is nearby
+    located = [c for c in candidates if _coordinates(c)]
+    unlocated = [c for c in candidates if not _coordinates(c)]
+    if unlocated:
+        print(f"   ⚠️ {len(unlocated)} candidate(s) have no coordinates and will not be scored")
+
+    infrastructures, infra_lookups = fetch_shared_infrastructure(located)
+
+    # First pass: score without reviews
+    scored = []
+    for place_data, infrastructure in zip(located, infrastructures):
+        first_pass_score, _ = calculate_safety_score(place_data, [], infrastructure)
+        scored.append((first_pass_score, place_data, infrastructure))
+    scored.sort(key=lambda item: item[0], reverse=True)
+
+    shortlisted = scored[:top_k]
+    print(f"\n🔬 Running full analysis for top {len(shortlisted)} candidates...")
+
+    def full_analysis(item):
+        _, place_data, infrastructure = item
+        google_reviews = []
+        if place_data.get("data_id"):
+            google_reviews = fetch_google_maps_reviews(place_data["data_id"])
+        return analyze_place(place_data, google_reviews, infrastructure=infrastructure)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(shortlisted), BATCH_WORKERS))) as pool:
+        reports = list(pool.map(full_analysis, shortlisted))
+
+    analyzed = []
+    for (first_pass_score, place_data, _), report in zip(shortlisted, reports):
+        analyzed.append({
+            "name": place_data["name"],
+            "data_id": place_data.get("data_id"),
+            "first_pass_score": first_pass_score,
+            "safety_score": report["safety_score"],
+            "verdict": report["verdict"],
+            "analyzed": True,
+            "report": report
+        })
+    analyzed.sort(key=lambda entry: entry["safety_score"], reverse=True)
+
+    # Not analyzed: only the first-pass score (rating + infrastructure) is known
+    remaining = [{
+        "name": place_data["name"],
+        "data_id": place_data.get("data_id"),
+        "first_pass_score": first_pass_score,
+        "first_pass_verdict": get_safety_verdict(first_pass_score),
+        "safety_score": None,
+        "verdict": None,
+        "analyzed": False
+    } for first_pass_score, place_data, _ in scored[top_k:]]
+
+    not_scored = [{
+        "name": place_data["name"],
+        "data_id": place_data.get("data_id"),
+        "first_pass_score": None,
+        "first_pass_verdict": None,
+        "safety_score": None,
+        "verdict": None,
+        "analyzed": False,
+        "note": "No coordinates from Google Maps; not scored"
+    } for place_data in unlocated]
+
+    ranking = analyzed + remaining + not_scored
+    for rank, entry in enumerate(ranking, start=1):
+        entry["rank"] = rank
+
+    # 1 search + infra lookups + per shortlisted hotel: reviews, social search, gemini
+    upstream_calls = 1 + infra_lookups + 3 * len(shortlisted)
+
+    return {
+        "query": query,
+        "candidates_found": len(candidates),
+        "fully_analyzed": len(shortlisted),
+        "not_scored": len(unlocated),
+        "infrastructure_lookups": infra_lookups,
+        "estimated_upstream_calls": upstream_calls,
+        "ranking": ranking
+    }
+
+
+def print_ranking(ranking):
+    """Print ranked hotels to console"""
+    print("\n" + "="*60)
+    print(f"🏆 SAFEST HOTELS: {ranking['query']}")
+    print("="*60)
+    for entry in ranking["ranking"]:
+        if entry["analyzed"]:
+            result = f"{entry['safety_score']}/100 ({entry['verdict']})"
+        elif entry["first_pass_score"] is not None:
+            result = f"first pass {entry['first_pass_score']}/100 ({entry['first_pass_verdict']})"
+        else:
+            result = entry["note"]
+        marker = "🔬" if entry["analyzed"] else "  "
+        print(f"{entry['rank']:>3}. {marker} {entry['name']} - {result}")
+    print(f"\n📊 {ranking['candidates_found']} candidates, {ranking['fully_analyzed']} fully analyzed, "
+          f"{ranking['not_scored']} without coordinates, ~{ranking['estimated_upstream_calls']} upstream calls")
+    print("="*60)
@@ -0,0 +1,154 @@
+"""
+Batch analysis of hotel lists with a worker pool and resumable output
+"""
+import csv
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from provider_limits import enable_provider_limits
+from config import BATCH_WORKERS, LOCATION
+
+
+def read_jsonl_rows(f):
+    """Yield the objects of a JSONL file, reporting and skipping other lines"""
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"   ⚠️ Skipping line {line_no}: invalid JSON ({e})")
+            continue
+        if not isinstance(row, dict):
+            print(f"   ⚠️ Skipping line {line_no}: expected an object, got {type(row).__name__}")
+            continue
+        yield row
+
+
+def read_hotels(path):
+    """
+    Read hotels from a CSV or JSONL file.
+    Each row needs a name ("hotel_name" or "name") and may carry a
+    location bias ("location" or "location_bias").
+    """
+    hotels = []
+    # utf-8-sig drops the BOM spreadsheet exports put before the CSV header
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            rows = read_jsonl_rows(f)
+        else:
+            rows = csv.DictReader(f)
+
+        for row in rows:
+            name = str(row.get("hotel_name") or row.get("name") or "").strip()
+            if not name:
+                continue
+            location = str(row.get("location") or row.get("location_bias") or "").strip()
+            hotels.append({"hotel_name": name, "location": location or LOCATION})
+
+    return hotels
+
+
+def hotel_key(hotel):
+    """Identity of a batch input row, used for checkpointing"""
+    return f"{hotel['hotel_name'].strip().lower()}|{hotel['location']}"
+
+
+def load_completed(output_path):
+    """
+    Return keys of hotels already analyzed successfully in the output file.
+    Lines with an error are retried; a partially written last line is ignored.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" not in entry.get("report", {"error": True}):
+                completed.add(hotel_key(entry["input"]))
+
+    return completed
+
+
+def _open_output(output_path):
+    """Open the output for appending, terminating any partial last line"""
+    needs_newline = False
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+
+    out = open(output_path, "a", encoding="utf-8")
+    if needs_newline:
+        out.write("\n")
+    return out
+
+
+def run_batch(input_path, output_path, workers=BATCH_WORKERS, analyze=None):
+    """
+    Analyze every hotel in input_path, appending one JSON line per hotel to
+    output_path as results complete. Hotels already present in the output
+    are skipped, so an interrupted run can simply be restarted.
+    Returns (succeeded, failed) counts for this run.
+    """
+    if analyze is None:
+        from main import run_analysis
+        analyze = run_analysis
+
+    hotels = read_hotels(input_path)
+    completed = load_completed(output_path)
+    pending = []
+    seen = set(completed)
+    for hotel in hotels:
+        key = hotel_key(hotel)
+        if key not in seen:
+            seen.add(key)
+            pending.append(hotel)
+
+    print(f"📋 {len(hotels)} hotels in input, {len(completed)} already done, {len(pending)} to analyze")
+    if not pending:
+        return 0, 0
+
+    # Keep the worker pool from bursting past the providers' rate limits
+    enable_provider_limits()
+    write_lock = threading.Lock()
+    counts = {"ok": 0, "failed": 0}
+
+    def work(hotel):
+        try:
+            report = analyze(query=hotel["hotel_name"], location_bias=hotel["location"])
+        except Exception as e:
+            report = {"error": str(e)}
+
+        line = json.dumps({"input": hotel, "report": report}, ensure_ascii=False)
+        with write_lock:
+            out.write(line + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            status = "failed" if "error" in report else "ok"
+            counts[status] += 1
+            done = counts["ok"] + counts["failed"]
+            marker = "✗" if status == "failed" else "✓"
+            print(f"   {marker} [{done}/{len(pending)}] {hotel['hotel_name']}")
+
+    out = _open_output(output_path)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(work, hotel) for hotel in pending]
+        for future in as_completed(futures):
+            future.result()
+    except KeyboardInterrupt:
+        print("\n⚠️  Batch interrupted, finishing in-flight hotels; rerun to resume")
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        out.close()
+
+    return counts["ok"], counts["failed"]
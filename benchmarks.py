@@ -0,0 +1,355 @@
+"""
+Microbenchmarks for the CPU-bound hot paths
+
+Times the pure-Python work done per analysis on synthetic inputs at today's
+sizes and at 10x/100x/1000x, without touching the network:
+
+    keyword_scan          count_negative_reviews over a ReviewBatch
+    review_batch          building the ReviewBatch from fetcher dicts
+    parse_ai_response     regex extraction + bracket repair of Gemini output,
+                          including truncated, unbalanced and prose-only replies
+    extract_from_text     the text fallback used when JSON repair fails
+    score_breakdown       safety score, verdict and detailed breakdown
+    tally_infrastructure  counting Overpass elements per infrastructure type
+    save_report / jsonify report serialization to disk and to the API
+
+Each case reports the best and median time per call over several repeats.
+Results can be written as JSON and compared against a baseline; the run
+exits non-zero if any case got slower than the threshold allows. A case only
+counts as regressed if it is also slower by more than an absolute noise floor,
+and it is re-timed before failing, so sub-millisecond cases don't flap.
+
+Usage:
+    python benchmarks.py --json bench_baseline.json
+    python benchmarks.py --compare bench_baseline.json --threshold 0.2
+    python benchmarks.py --only parse_ai_response --scales 1 100
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+
+from flask import Flask, jsonify
+
+from ai_analyzer import parse_ai_response, extract_from_text
+from data_fetchers import tally_infrastructure
+from reviews import ReviewBatch
+from safety_scorer import (
+    calculate_safety_score,
+    count_negative_reviews,
+    get_safety_verdict,
+    get_detailed_breakdown
+)
+from report_generator import generate_report, save_report
+from config import NEGATIVE_KEYWORDS, MAX_REVIEWS_TO_ANALYZE, MAX_TWEETS, MAX_REDDIT_POSTS
+
+DEFAULT_SCALES = [1, 10, 100, 1000]
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_MIN_DELTA_S = 50e-6  # Slowdowns smaller than this are timer/cache noise
+DEFAULT_RECHECKS = 2  # Re-time a regressed case this many times before failing it
+
+# Today's per-analysis sizes; every input is multiplied by the scale
+BASE_OVERPASS_ELEMENTS = 150
+BASE_AI_LIST_ITEMS = 5
+
+WORDS = (
+    "room staff clean breakfast location pool view friendly quiet lobby check-in "
+    "service bathroom bed comfortable spacious parking airport family safe helpful "
+    "restaurant wifi noisy night street security reception booking value stay"
+).split()
+
+
+def synthetic_reviews(rng, count, negative_share=0.2):
+    """Review texts of realistic length, some containing a negative keyword"""
+    texts = []
+    for _ in range(count):
+        words = rng.choices(WORDS, k=rng.randint(15, 60))
+        if rng.random() < negative_share:
+            words.insert(rng.randrange(len(words)), rng.choice(NEGATIVE_KEYWORDS).upper())
+        texts.append(" ".join(words).capitalize() + ".")
+    return texts
+
+
+def synthetic_sources(rng, scale):
+    """(google_reviews, twitter_reviews, reddit_reviews) in the fetchers' dict shapes"""
+    google = [
+        {"source": "Google Maps", "rating": rng.randint(1, 5), "text": text,
+         "date": "2 weeks ago", "author": f"Guest {i}"}
+        for i, text in enumerate(synthetic_reviews(rng, MAX_REVIEWS_TO_ANALYZE * scale))
+    ]
+    twitter = [
+        {"source": "Twitter/X", "text": text, "link": f"https://x.com/status/{i}"}
+        for i, text in enumerate(synthetic_reviews(rng, MAX_TWEETS * scale))
+    ]
+    reddit = [
+        {"title": " ".join(rng.choices(WORDS, k=6)), "snippet": text,
+         "link": f"https://reddit.com/r/pune/{i}"}
+        for i, text in enumerate(synthetic_reviews(rng, MAX_REDDIT_POSTS * scale))
+    ]
+    return google, twitter, reddit
+
+
+def synthetic_elements(rng, scale):
+    """Overpass elements with the tag mix a city-centre query returns"""
+    tag_choices = [
+        {"highway": "primary"}, {"highway": "secondary"}, {"highway": "tertiary"},
+        {"highway": "street_lamp"}, {"amenity": "police"}, {"amenity": "hospital"},
+        {"emergency": "fire_station"}, {"amenity": "cafe"}, {}
+    ]
+    weights = [30, 25, 25, 10, 2, 3, 1, 3, 1]
+    return [
+        {"type": "node", "id": i, "tags": dict(tags)}
+        for i, tags in enumerate(rng.choices(tag_choices, weights, k=BASE_OVERPASS_ELEMENTS * scale))
+    ]
+
+
+def synthetic_ai_analysis(rng, scale):
+    items = BASE_AI_LIST_ITEMS * scale
+    return {
+        "assessment": "Moderate",
+        "concerns": [" ".join(rng.choices(WORDS, k=12)) for _ in range(items)],
+        "positives": [" ".join(rng.choices(WORDS, k=12)) for _ in range(items)],
+        "recommendations": [" ".join(rng.choices(WORDS, k=12)) for _ in range(items)],
+        "confidence_score": 72
+    }
+
+
+def synthetic_llm_outputs(rng, scale):
+    """Model replies keyed by shape, from well-formed to pathological"""
+    analysis = synthetic_ai_analysis(rng, scale)
+    clean = json.dumps(analysis, indent=2)
+    prose_lines = [f"- {' '.join(rng.choices(WORDS, k=14))}" for _ in range(BASE_AI_LIST_ITEMS * 3 * scale)]
+    prose = ("Overall the hotel appears moderately safe. Guests recommend it for families. "
+             "Concerns and positives are listed below.\n" + "\n".join(prose_lines))
+    depth = 50 * scale
+    return {
+        "clean": clean,
+        "fenced": f"Here is the analysis you asked for:\n```json\n{clean}\n```\nLet me know if you need more.",
+        # Output cut off mid-string, as when the model hits its token limit
+        "truncated": clean[:int(len(clean) * 0.7)],
+        # Runaway nesting that never closes; repair appends thousands of brackets
+        "unbalanced": '{"assessment": "Moderate", "concerns": ' + "[" * depth + '"x", ' * depth,
+        # No JSON at all; falls through to extract_from_text
+        "prose": prose,
+    }
+
+
+def build_report(rng, scale, sources, batch, infrastructure):
+    place_data = {
+        "name": "Benchmark Hotel", "data_id": "0x0:0x0", "rating": 4.2,
+        "reviews": 1200, "address": "Benchmark Road, Pune", "type": ["Hotel"]
+    }
+    score, negative_hits = calculate_safety_score(place_data, batch, infrastructure)
+    report = generate_report(
+        place_data, batch, infrastructure, score, negative_hits,
+        synthetic_ai_analysis(rng, scale), get_safety_verdict(score),
+        *sources,
+        get_detailed_breakdown(score, place_data, infrastructure, negative_hits)
+    )
+    # Reports cap the embedded reviews; scale them too so larger caps are covered
+    report["all_reviews"] = batch.view(0, MAX_REVIEWS_TO_ANALYZE * scale).to_dicts()
+    return place_data, report
+
+
+def build_cases(scale, seed=0):
+    """Return [(path, case, fn)] for one scale"""
+    rng = random.Random(seed + scale)
+    google, twitter, reddit = synthetic_sources(rng, scale)
+    batch = ReviewBatch.from_sources(google, twitter, reddit)
+    elements = synthetic_elements(rng, scale)
+    infrastructure = tally_infrastructure(elements)
+    place_data, report = build_report(rng, scale, (google, twitter, reddit), batch, infrastructure)
+    llm_outputs = synthetic_llm_outputs(rng, scale)
+
+    app = Flask("benchmarks")
+    report_path = os.path.join(tempfile.gettempdir(), f"benchmark_report_{os.getpid()}.json")
+
+    def score_breakdown():
+        score, negative_hits = calculate_safety_score(place_data, batch, infrastructure)
+        get_safety_verdict(score)
+        get_detailed_breakdown(score, place_data, infrastructure, negative_hits)
+
+    def api_response():
+        with app.app_context():
+            jsonify(report).get_data()
+
+    cases = [
+        ("keyword_scan", "batch", lambda: count_negative_reviews(batch)),
+        ("review_batch", "from_sources", lambda: ReviewBatch.from_sources(google, twitter, reddit)),
+        ("extract_from_text", "prose", lambda: extract_from_text(llm_outputs["prose"])),
+        ("score_breakdown", "report", score_breakdown),
+        ("tally_infrastructure", "elements", lambda: tally_infrastructure(elements)),
+        ("save_report", "file", lambda: save_report(report, report_path)),
+        ("jsonify", "response", api_response),
+    ]
+    for shape, content in llm_outputs.items():
+        cases.append(("parse_ai_response", shape, lambda content=content: parse_ai_response(content)))
+    return cases, report_path
+
+
+def time_call(fn, repeat):
+    """(best, median) seconds per call; the loop count is picked so each repeat runs ~0.2s"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    per_call = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return min(per_call), statistics.median(per_call), number
+
+
+def time_quietly(fn, repeat):
+    # The repair and save paths print progress; keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return time_call(fn, repeat)
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, only=None, repeat=DEFAULT_REPEAT, seed=0):
+    """Run every case at every scale; returns {"meta": ..., "results": {name: timings}}"""
+    results = {}
+    for scale in scales:
+        cases, report_path = build_cases(scale, seed)
+        for path, case, fn in cases:
+            if only and path not in only:
+                continue
+            best, median, number = time_quietly(fn, repeat)
+            name = f"{path}[{case}]@{scale}x"
+            results[name] = {
+                "path": path, "case": case, "scale": scale,
+                "best_s": best, "median_s": median, "loops": number
+            }
+            print(f"   {name:<45} best {format_seconds(best):>10}   median {format_seconds(median):>10}")
+        if os.path.exists(report_path):
+            os.remove(report_path)
+
+    return {
+        "meta": {
+            "generated_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "repeat": repeat,
+            "seed": seed
+        },
+        "results": results
+    }
+
+
+def retime(current, names, repeat=DEFAULT_REPEAT, seed=0):
+    """Time the named cases again, keeping the best time seen for each"""
+    results = current["results"]
+    for scale in sorted({results[name]["scale"] for name in names}):
+        cases, report_path = build_cases(scale, seed)
+        for path, case, fn in cases:
+            name = f"{path}[{case}]@{scale}x"
+            if name not in names:
+                continue
+            best, _, _ = time_quietly(fn, repeat)
+            results[name]["best_s"] = min(results[name]["best_s"], best)
+            results[name]["rechecks"] = results[name].get("rechecks", 0) + 1
+        if os.path.exists(report_path):
+            os.remove(report_path)
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD, min_delta=DEFAULT_MIN_DELTA_S):
+    """
+    Compare best-of-N times against a baseline run. A case regresses when it is
+    both more than threshold slower and more than min_delta seconds slower.
+    Returns a list of (name, baseline_s, current_s, ratio, regressed).
+    """
+    rows = []
+    for name, timing in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = timing["best_s"] / base["best_s"] if base["best_s"] else float("inf")
+        regressed = ratio > 1 + threshold and timing["best_s"] - base["best_s"] > min_delta
+        rows.append((name, base["best_s"], timing["best_s"], ratio, regressed))
+    return rows
+
+
+def print_comparison(rows, current, baseline, threshold, min_delta):
+    print("\n" + "="*80)
+    print(f"📊 COMPARISON AGAINST BASELINE (threshold +{threshold:.0%} and +{format_seconds(min_delta)})")
+    print("="*80)
+    if baseline["meta"].get("python") != current["meta"].get("python"):
+        print(f"⚠️  Baseline ran on Python {baseline['meta'].get('python')}, "
+              f"this run on {current['meta'].get('python')}")
+    for name, base_s, current_s, ratio, regressed in rows:
+        marker = "❌" if regressed else ("✅" if ratio < 1 - threshold else "  ")
+        print(f"{marker} {name:<45} {format_seconds(base_s):>10} -> {format_seconds(current_s):>10}  ({ratio:.2f}x)")
+
+    missing = set(baseline["results"]) - set(current["results"])
+    if missing:
+        print(f"\n   {len(missing)} baseline case(s) not run this time")
+    print("="*80)
+
+
+def format_seconds(seconds):
+    for unit, factor in (("s", 1), ("ms", 1e3), ("µs", 1e6)):
+        if seconds >= 1 / factor:
+            return f"{seconds * factor:.2f} {unit}"
+    return f"{seconds * 1e9:.0f} ns"
+
+
+def main():
+    """CLI Entry point"""
+    parser = argparse.ArgumentParser(description="Microbenchmarks for CPU hot paths")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="Input size multipliers relative to today's sizes")
+    parser.add_argument("--only", nargs="+", default=None,
+                        help="Run only these paths (e.g. parse_ai_response keyword_scan)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_output", default=None,
+                        help="Write results as JSON to this file")
+    parser.add_argument("--compare", default=None,
+                        help="Baseline JSON from an earlier run; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown as a fraction (0.2 = 20%%)")
+    parser.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_S * 1e6,
+                        help="Ignore slowdowns smaller than this many microseconds")
+    parser.add_argument("--rechecks", type=int, default=DEFAULT_RECHECKS,
+                        help="Re-time regressed cases (with twice the repeats) this many times before failing")
+    args = parser.parse_args()
+
+    print(f"⏱️  Running microbenchmarks at scales {args.scales}...")
+    current = run_benchmarks(args.scales, args.only, args.repeat, args.seed)
+
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=4)
+        print(f"\n📄 Results saved to: {args.json_output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        min_delta = args.min_delta_us / 1e6
+        rows = compare_results(current, baseline, args.threshold, min_delta)
+        for _ in range(args.rechecks):
+            regressed = {row[0] for row in rows if row[4]}
+            if not regressed:
+                break
+            print(f"\n🔁 Re-timing {len(regressed)} case(s) that look slower...")
+            retime(current, regressed, args.repeat * 2, args.seed)
+            rows = compare_results(current, baseline, args.threshold, min_delta)
+
+        print_comparison(rows, current, baseline, args.threshold, min_delta)
+        regressions = [row for row in rows if row[4]]
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Benchmarks interrupted by user")
@@ -39,6 +39,15 @@ INFRASTRUCTURE_WEIGHTS = {
     "fire_station": 5
 }
 
+# Infrastructure search radii (meters)
+INFRA_AMENITY_RADIUS_M = 1000  # police, hospitals, fire stations
+INFRA_ROAD_RADIUS_M = 500  # primary/secondary/tertiary roads
+
+# Precomputed infrastructure grid (see infra_grid.py)
+INFRA_GRID_FILE = os.getenv("INFRA_GRID_FILE", "infra_grid.bin")
+INFRA_GRID_CHECK_INTERVAL_S = 1.0  # How often the server looks for a rebuilt grid
+INFRA_GRID_CELL_M = 100
+
 # Limits
 MAX_STREET_LIGHT_SCORE = 15
 MAX_POLICE_SCORE = 20
@@ -51,10 +60,69 @@ NEGATIVE_REVIEW_PENALTY_PER_HIT = 3
 MAX_REVIEWS_TO_ANALYZE = 20  # Max from Google Maps
 MAX_TWEETS = 15  # Max from Twitter/X
 MAX_REDDIT_POSTS = 15  # Max from Reddit
+SOCIAL_SEARCH_MAX_PAGES = 2  # Pages of the combined Twitter/X + Reddit search
+
+# Name Resolution Index (skips the Maps search for known hotels)
+NAME_INDEX_FILE = os.getenv("NAME_INDEX_FILE", "name_index.jsonl")
+NAME_INDEX_MIN_CONFIDENCE = 0.85  # 0-1 trigram similarity needed to trust a match
+NAME_INDEX_AMBIGUITY_MARGIN = 0.05  # Runner-up place this close to the best -> don't trust either
+NAME_INDEX_MIN_TOKEN_SIMILARITY = 0.6  # Every word of a known name must match a query word this well
+NAME_INDEX_MAX_DISTANCE_KM = 25  # Ignore matches this far from the location bias
+NAME_INDEX_TTL_DAYS = 30  # Re-resolve places (rating, review count) after this long
+NAME_INDEX_COMPACT_FACTOR = 2  # Compact the log once it holds this many records per place
+
+# Report Cache
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", "report_cache")
+REPORT_CACHE_TTL_S = 24 * 3600
+
+# Report Snapshot (shared read-only by all server workers, see report_snapshot.py)
+SNAPSHOT_FILE = os.getenv("SNAPSHOT_FILE", "reports.snapshot")
+SNAPSHOT_CHECK_INTERVAL_S = 1.0  # How often workers look for a rebuilt snapshot
+SNAPSHOT_CLOCK_SLACK_S = 1.0  # A cache entry this close to the snapshot's copy is the same report
+
+# Background Refresh (pre-warms popular hotels' reports)
+REFRESH_SCHEDULER_ENABLED = os.getenv("REFRESH_SCHEDULER_ENABLED", "1") == "1"
+REFRESH_HOT_SET_SIZE = 300  # Only the most requested hotels are kept warm
+REFRESH_POPULARITY_HALF_LIFE_S = 3 * 24 * 3600
+REFRESH_POPULARITY_MAX_ENTRIES = 4 * REFRESH_HOT_SET_SIZE  # Hotels tracked beyond this are the least popular
+REFRESH_POPULARITY_SWEEP_EVERY = 256  # Prune the popularity table after this many new hotels
+REFRESH_POPULARITY_DIR = os.path.join(REPORT_CACHE_DIR, "popularity")  # Per-worker counts merged by the leader
+REFRESH_AHEAD_S = 2 * 3600  # Refresh this long before a cached report expires
+REFRESH_OFF_PEAK_HOURS = range(1, 6)  # Local hours where refreshes start at half the TTL
+REFRESH_TICK_S = 60
+UPSTREAM_CALLS_PER_HOUR = int(os.getenv("UPSTREAM_CALLS_PER_HOUR", 1000))  # Paid quota across providers
+REFRESH_QUOTA_SHARE = float(os.getenv("REFRESH_QUOTA_SHARE", 0.2))  # Max share used by refreshes
+UPSTREAM_CALLS_PER_ANALYSIS = 4  # maps search + reviews + social search + gemini
+
+# Score History (append-only, see score_history.py)
+HISTORY_DIR = os.getenv("HISTORY_DIR", "score_history")
+CHANGE_RECENT_DAYS = 7  # Window checked for changes
+CHANGE_BASELINE_DAYS = 30  # Window before it used as the baseline
+CHANGE_MIN_SCORE_DROP = 5  # Points the mean score must fall to be flagged
+CHANGE_Z_THRESHOLD = 3.0  # Significance needed for drops and keyword surges
+
+# Area Ranking
+AREA_RANKING_TOP_K = 5  # Hotels that get reviews + AI analysis after the first pass
+AREA_RANKING_MAX_TOP_K = 20  # Upper bound on top_k so one request can't analyze a whole area
+AREA_INFRA_SHARE_RADIUS_M = 300  # Hotels this close share one infrastructure lookup
+
+# Batch Processing
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 8))
+# Max concurrent in-flight calls per upstream provider (shared by all workers)
+PROVIDER_CONCURRENCY = {
+    "serpapi": int(os.getenv("SERPAPI_CONCURRENCY", 4)),
+    "overpass": int(os.getenv("OVERPASS_CONCURRENCY", 2)),
+    "gemini": int(os.getenv("GEMINI_CONCURRENCY", 4))
+}
 
-# API URLs
-OVERPASS_URL = "https://overpass-api.de/api/interpreter"
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+# API URLs (overridable so the load-test harness can point at local stubs)
+SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com")
+OVERPASS_URL = os.getenv("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
+OVERPASS_FALLBACK_URL = os.getenv("OVERPASS_FALLBACK_URL", "https://overpass.kumi.systems/api/interpreter")
+GEMINI_API_URL = os.getenv(
+    "GEMINI_API_URL",
+    "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+)
 
 # Output
 OUTPUT_FILE = "comprehensive_safety_report.json"
\ No newline at end of file
@@ -2,14 +2,19 @@
 Data fetching functions for Hotel Safety Analyzer
 """
 import requests
+from urllib.parse import urlparse
 from serpapi import GoogleSearch
 from config import *
+from provider_limits import provider_slot
+from name_index import get_name_index
 
+# Route SerpAPI traffic through the configured backend (real service or a local stub)
+GoogleSearch.BACKEND = SERPAPI_URL
 
-def fetch_google_maps_data(query=QUERY, location=LOCATION):
-    """Fetch place data and reviews from Google Maps using two-step approach"""
-    
-    # Step 1: Search for the place (without ll parameter which causes issues)
+
+def search_google_maps(query=QUERY, location=LOCATION):
+    """Run a Google Maps search and return the raw SerpAPI results"""
+    # Search without ll parameter, which causes issues
     search_params = {
         "engine": "google_maps",
         "type": "search",
@@ -18,151 +23,208 @@ def fetch_google_maps_data(query=QUERY, location=LOCATION):
         "api_key": SERPAPI_KEY
     }
     
-    results = GoogleSearch(search_params).get_dict()
+    with provider_slot("serpapi"):
+        results = GoogleSearch(search_params).get_dict()
     
     # Debug: Print what we got from SerpAPI
     if "error" in results:
         print(f"   ⚠️ SerpAPI Search Error: {results.get('error')}")
     
-    # Get the first local result (the hotel we're looking for)
-    local_results = results.get("local_results", [])
-    place = {}
-    data_id = None
-    
-    if local_results:
-        place = local_results[0]
-        data_id = place.get("data_id")
-        print(f"   ✓ Found place: {place.get('title')} (data_id: {data_id[:20] if data_id else 'N/A'}...)")
-    else:
-        # Try place_results as fallback
-        place = results.get("place_results", {})
-        data_id = place.get("data_id")
-    
-    place_data = {
+    return results
+
+
+def to_place_data(place):
+    """Convert a SerpAPI place result into our place_data shape"""
+    return {
         "name": place.get("title"),
+        "data_id": place.get("data_id"),
         "rating": place.get("rating", 0),
         "total_reviews": place.get("reviews", 0),
         "address": place.get("address"),
         "coordinates": place.get("gps_coordinates"),
         "types": place.get("type", [])
     }
-    
+
+
+def fetch_google_maps_reviews(data_id):
+    """Fetch Google Maps reviews for a place by its data_id"""
     reviews = []
     
-    # Step 2: Fetch reviews using data_id if available
-    if data_id:
-        try:
-            reviews_params = {
-                "engine": "google_maps_reviews",
-                "data_id": data_id,
-                "hl": "en",
-                "api_key": SERPAPI_KEY
-            }
-            
+    try:
+        reviews_params = {
+            "engine": "google_maps_reviews",
+            "data_id": data_id,
+            "hl": "en",
+            "api_key": SERPAPI_KEY
+        }
+        
+        with provider_slot("serpapi"):
             reviews_results = GoogleSearch(reviews_params).get_dict()
-            
-            if "error" in reviews_results:
-                print(f"   ⚠️ SerpAPI Reviews Error: {reviews_results.get('error')}")
-            else:
-                reviews_data = reviews_results.get("reviews", [])
-                for r in reviews_data[:MAX_REVIEWS_TO_ANALYZE]:
-                    reviews.append({
-                        "source": "Google Maps",
-                        "rating": r.get("rating"),
-                        "text": r.get("snippet", r.get("text", "")),
-                        "date": r.get("date", ""),
-                        "author": r.get("user", {}).get("name", "Anonymous")
-                    })
-        except Exception as e:
-            print(f"   ⚠️ Could not fetch reviews: {e}")
+        
+        if "error" in reviews_results:
+            print(f"   ⚠️ SerpAPI Reviews Error: {reviews_results.get('error')}")
+        else:
+            reviews_data = reviews_results.get("reviews", [])
+            for r in reviews_data[:MAX_REVIEWS_TO_ANALYZE]:
+                reviews.append({
+                    "source": "Google Maps",
+                    "rating": r.get("rating"),
+                    "text": r.get("snippet", r.get("text", "")),
+                    "date": r.get("date", ""),
+                    "author": r.get("user", {}).get("name", "Anonymous")
+                })
+    except Exception as e:
+        print(f"   ⚠️ Could not fetch reviews: {e}")
     
-    return place_data, reviews
+    return reviews
 
 
-def fetch_twitter_reviews(hotel_name):
-    """Fetch Twitter/X mentions using Google search (since Twitter engine is unsupported)"""
-    params = {
-        "engine": "google",
-        "q": f"{hotel_name} hotel (site:twitter.com OR site:x.com)",
-        "api_key": SERPAPI_KEY,
-        "num": MAX_TWEETS
-    }
+def fetch_google_maps_data(query=QUERY, location=LOCATION):
+    """Fetch place data and reviews from Google Maps using two-step approach"""
+    name_index = get_name_index()
     
-    try:
-        results = GoogleSearch(params).get_dict()
-        
-        # Debug: Check for errors
-        if "error" in results:
-            print(f"   ⚠️ SerpAPI Twitter Search Error: {results.get('error')}")
-            return []
+    # Step 1: Resolve the place from the local name index, or search for it
+    place_data, confidence = name_index.resolve(query, location)
+    if place_data:
+        print(f"   ✓ Resolved from name index: {place_data['name']} (confidence {confidence:.2f})")
+    else:
+        results = search_google_maps(query, location)
         
-        search_results = results.get("organic_results", [])
+        # Get the first local result (the hotel we're looking for)
+        local_results = results.get("local_results", [])
         
-        social_reviews = []
-        for result in search_results[:MAX_TWEETS]:
-            social_reviews.append({
-                "source": "Twitter/X",
-                "text": result.get("snippet", ""),
-                "author": result.get("title", "").split(" on X:")[0] if " on X:" in result.get("title", "") else "Anonymous",
-                "date": "",
-                "link": result.get("link", "")
-            })
+        if local_results:
+            place = local_results[0]
+            data_id = place.get("data_id")
+            print(f"   ✓ Found place: {place.get('title')} (data_id: {data_id[:20] if data_id else 'N/A'}...)")
+        else:
+            # Try place_results as fallback
+            place = results.get("place_results", {})
         
-        return social_reviews
-    except Exception as e:
-        print(f"Warning: Could not fetch Twitter data - {e}")
-        return []
+        place_data = to_place_data(place)
+        name_index.add(place_data, query=query)
+    
+    # Step 2: Fetch reviews using data_id if available
+    reviews = []
+    if place_data["data_id"]:
+        reviews = fetch_google_maps_reviews(place_data["data_id"])
+    
+    return place_data, reviews
 
 
-def fetch_reddit_reviews(hotel_name):
-    """Fetch Reddit discussions about the hotel"""
-    params = {
-        "engine": "google",
-        "q": f"{hotel_name} site:reddit.com",
-        "api_key": SERPAPI_KEY
-    }
+def fetch_google_maps_candidates(query, location=LOCATION):
+    """Fetch every place returned by a Google Maps search (no reviews)"""
+    results = search_google_maps(query, location)
     
-    try:
-        results = GoogleSearch(params).get_dict()
-        reddit_results = results.get("organic_results", [])
-        
-        reddit_reviews = []
-        for post in reddit_results[:MAX_REDDIT_POSTS]:
-            reddit_reviews.append({
-                "source": "Reddit",
-                "title": post.get("title", ""),
-                "snippet": post.get("snippet", ""),
-                "link": post.get("link", "")
-            })
-        
-        return reddit_reviews
-    except Exception as e:
-        print(f"Warning: Could not fetch Reddit data - {e}")
-        return []
+    local_results = results.get("local_results", [])
+    if not local_results and results.get("place_results"):
+        local_results = [results["place_results"]]
+    
+    candidates = [to_place_data(place) for place in local_results]
+    
+    # Every returned place is a future name-resolution hit
+    name_index = get_name_index()
+    for place_data in candidates:
+        name_index.add(place_data)
+    
+    return candidates
 
 
-def fetch_infrastructure_data(lat=LAT, lon=LON):
-    """Fetch nearby infrastructure from OpenStreetMap"""
-    # Simplified query to reduce server load (removed street_lamp - too many results)
-    query = f"""
-    [out:json][timeout:25];
-    (
-      node["amenity"="police"](around:1000,{lat},{lon});
-      node["amenity"="hospital"](around:1000,{lat},{lon});
-      node["emergency"="fire_station"](around:1000,{lat},{lon});
-      way["highway"~"primary|secondary|tertiary"](around:500,{lat},{lon});
-    );
-    out count;
-    out;
+def fetch_social_reviews(hotel_name):
     """
+    Fetch Twitter/X and Reddit mentions with one combined Google search,
+    paging only while a quota is unfilled and more results exist.
+    Returns (twitter_reviews, reddit_reviews).
+    """
+    per_page = MAX_TWEETS + MAX_REDDIT_POSTS
+    twitter_reviews, reddit_reviews = [], []
     
-    # Overpass API endpoints to try (primary + fallback)
-    overpass_endpoints = [
-        OVERPASS_URL,
-        "https://overpass.kumi.systems/api/interpreter"  # Fallback endpoint
-    ]
+    try:
+        for page in range(SOCIAL_SEARCH_MAX_PAGES):
+            params = {
+                "engine": "google",
+                "q": f"{hotel_name} hotel (site:twitter.com OR site:x.com OR site:reddit.com)",
+                "api_key": SERPAPI_KEY,
+                "num": per_page,
+                "start": page * per_page
+            }
+            
+            with provider_slot("serpapi"):
+                results = GoogleSearch(params).get_dict()
+            
+            if "error" in results:
+                print(f"   ⚠️ SerpAPI Social Search Error: {results.get('error')}")
+                break
+            
+            search_results = results.get("organic_results", [])
+            for result in search_results:
+                source = social_source(result.get("link", ""))
+                if source == "Twitter/X" and len(twitter_reviews) < MAX_TWEETS:
+                    twitter_reviews.append(to_twitter_review(result))
+                elif source == "Reddit" and len(reddit_reviews) < MAX_REDDIT_POSTS:
+                    reddit_reviews.append(to_reddit_review(result))
+            
+            quotas_filled = len(twitter_reviews) >= MAX_TWEETS and len(reddit_reviews) >= MAX_REDDIT_POSTS
+            if quotas_filled or len(search_results) < per_page:
+                break
+    except Exception as e:
+        print(f"Warning: Could not fetch social data - {e}")
     
-    default_infrastructure = {
+    return twitter_reviews, reddit_reviews
+
+
+def social_source(link):
+    """Which social source a search result link belongs to (or None)"""
+    host = urlparse(link).netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host in ("twitter.com", "x.com") or host.endswith((".twitter.com", ".x.com")):
+        return "Twitter/X"
+    if host == "reddit.com" or host.endswith(".reddit.com"):
+        return "Reddit"
+    return None
+
+
+def to_twitter_review(result):
+    """Convert a Google organic result for a tweet into our review shape"""
+    title = result.get("title", "")
+    return {
+        "source": "Twitter/X",
+        "text": result.get("snippet", ""),
+        "author": title.split(" on X:")[0] if " on X:" in title else "Anonymous",
+        "date": "",
+        "link": result.get("link", "")
+    }
+
+
+def to_reddit_review(post):
+    """Convert a Google organic result for a Reddit post into our review shape"""
+    return {
+        "source": "Reddit",
+        "title": post.get("title", ""),
+        "snippet": post.get("snippet", ""),
+        "link": post.get("link", "")
+    }
+
+
+def classify_osm_element(tags):
+    """Map an OpenStreetMap element's tags to its infrastructure key (or None)"""
+    if tags.get("highway") == "street_lamp":
+        return "street_lights"
+    elif tags.get("amenity") == "police":
+        return "police_stations"
+    elif tags.get("amenity") == "hospital":
+        return "hospitals"
+    elif tags.get("emergency") == "fire_station":
+        return "fire_stations"
+    elif tags.get("highway"):
+        return "roads_nearby"
+    return None
+
+
+def tally_infrastructure(elements):
+    """Count Overpass elements per infrastructure key"""
+    infrastructure = {
         "street_lights": 0,
         "police_stations": 0,
         "hospitals": 0,
@@ -170,11 +232,28 @@ def fetch_infrastructure_data(lat=LAT, lon=LON):
         "roads_nearby": 0
     }
     
+    for el in elements:
+        key = classify_osm_element(el.get("tags", {}))
+        if key:
+            infrastructure[key] += 1
+    
+    return infrastructure
+
+
+def post_overpass_query(query, timeout=45):
+    """Run an Overpass QL query, falling back between endpoints; returns elements or None"""
+    # Overpass API endpoints to try (primary + fallback)
+    overpass_endpoints = [
+        OVERPASS_URL,
+        OVERPASS_FALLBACK_URL  # Fallback endpoint
+    ]
+    
     for endpoint in overpass_endpoints:
         try:
             # Use 'data' parameter with proper content-type for Overpass API
             headers = {"Content-Type": "application/x-www-form-urlencoded"}
-            osm_response = requests.post(endpoint, data={"data": query}, headers=headers, timeout=45)
+            with provider_slot("overpass"):
+                osm_response = requests.post(endpoint, data={"data": query}, headers=headers, timeout=timeout)
             
             # Debug: Check response status
             if osm_response.status_code == 504 or osm_response.status_code == 429:
@@ -186,35 +265,34 @@ def fetch_infrastructure_data(lat=LAT, lon=LON):
                 continue
             
             osm_data = osm_response.json()
-            elements = osm_data.get("elements", [])
-            
-            infrastructure = {
-                "street_lights": 0,
-                "police_stations": 0,
-                "hospitals": 0,
-                "fire_stations": 0,
-                "roads_nearby": 0
-            }
-            
-            for el in elements:
-                tags = el.get("tags", {})
-                if tags.get("highway") == "street_lamp":
-                    infrastructure["street_lights"] += 1
-                elif tags.get("amenity") == "police":
-                    infrastructure["police_stations"] += 1
-                elif tags.get("amenity") == "hospital":
-                    infrastructure["hospitals"] += 1
-                elif tags.get("emergency") == "fire_station":
-                    infrastructure["fire_stations"] += 1
-                elif tags.get("highway"):
-                    infrastructure["roads_nearby"] += 1
-            
-            return infrastructure
+            return osm_data.get("elements", [])
         
         except Exception as e:
             print(f"Warning: Could not fetch from {endpoint} - {e}")
             continue
     
-    # All endpoints failed
-    print("   ⚠️ All Overpass API endpoints failed, using defaults")
-    return default_infrastructure
\ No newline at end of file
+    return None
+
+
+def fetch_infrastructure_data(lat=LAT, lon=LON):
+    """Fetch nearby infrastructure from OpenStreetMap"""
+    # Simplified query to reduce server load (removed street_lamp - too many results)
+    query = f"""
+    [out:json][timeout:25];
+    (
+      node["amenity"="police"](around:{INFRA_AMENITY_RADIUS_M},{lat},{lon});
+      node["amenity"="hospital"](around:{INFRA_AMENITY_RADIUS_M},{lat},{lon});
+      node["emergency"="fire_station"](around:{INFRA_AMENITY_RADIUS_M},{lat},{lon});
+      way["highway"~"primary|secondary|tertiary"](around:{INFRA_ROAD_RADIUS_M},{lat},{lon});
+    );
+    out count;
+    out;
+    """
+    
+    elements = post_overpass_query(query)
+    if elements is None:
+        # All endpoints failed
+        print("   ⚠️ All Overpass API endpoints failed, using defaults")
+        return tally_infrastructure([])
+    
+    return tally_infrastructure(elements)
@@ -0,0 +1,320 @@
+"""
+Precomputed city-wide infrastructure grid
+
+A precompute job pulls police stations, hospitals, fire stations and major
+roads for a city bounding box in one Overpass query and stamps them onto a
+fixed-resolution grid using the same radii as the live per-hotel query.
+Roads are stamped by their full geometry, so like the live `around` filter a
+road counts for every cell whose center is within the radius of any of its
+segments. Each cell stores the infrastructure counts plus the capped
+sub-scores, so any coordinate inside the box gets an O(1) lookup from a
+memory-mapped file.
+
+Usage:
+    python infra_grid.py --bbox 18.42,73.75,18.65,74.02 --cell 100 --output infra_grid.bin
+"""
+import argparse
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from data_fetchers import classify_osm_element, post_overpass_query, fetch_infrastructure_data
+from safety_scorer import get_infrastructure_subscores, get_road_adjustment
+from config import (
+    INFRA_GRID_FILE, INFRA_GRID_CELL_M, INFRA_GRID_CHECK_INTERVAL_S,
+    INFRA_AMENITY_RADIUS_M, INFRA_ROAD_RADIUS_M
+)
+
+METERS_PER_DEGREE = 111320
+
+# File layout: header, then rows * cols fixed-size cell records (row 0 = south)
+GRID_MAGIC = b"INFG"
+GRID_VERSION = 2  # v2: roads stamped by geometry instead of way center
+HEADER = struct.Struct("<4sHHdddddIIdd")  # magic, version, pad, cell_m, south, west, north, east, rows, cols, cell_lat, cell_lon
+# counts: street_lights, police_stations, hospitals, fire_stations, roads_nearby
+# sub-scores: street_lights, police_stations, hospitals, fire_stations, road adjustment
+RECORD = struct.Struct("<5H4Bb")
+
+COUNT_KEYS = ["street_lights", "police_stations", "hospitals", "fire_stations", "roads_nearby"]
+SUBSCORE_KEYS = ["street_lights", "police_stations", "hospitals", "fire_stations"]
+MAX_COUNT = 0xFFFF
+
+
+def fetch_city_amenities(south, west, north, east):
+    """
+    Fetch all scored infrastructure in a bounding box.
+    Returns [(key, [(lat, lon), ...])]: one point for nodes, the polyline for roads.
+    """
+    # Pad the box so cells on the edge see amenities just outside it
+    mid_lat = math.radians((south + north) / 2)
+    lat_pad = INFRA_AMENITY_RADIUS_M / METERS_PER_DEGREE
+    lon_pad = INFRA_AMENITY_RADIUS_M / (METERS_PER_DEGREE * math.cos(mid_lat))
+    bbox = f"{south - lat_pad},{west - lon_pad},{north + lat_pad},{east + lon_pad}"
+    query = f"""
+    [out:json][timeout:180];
+    (
+      node["amenity"="police"]({bbox});
+      node["amenity"="hospital"]({bbox});
+      node["emergency"="fire_station"]({bbox});
+      way["highway"~"primary|secondary|tertiary"]({bbox});
+    );
+    out geom;
+    """
+
+    elements = post_overpass_query(query, timeout=240)
+    if elements is None:
+        raise RuntimeError("All Overpass API endpoints failed")
+
+    amenities = []
+    for el in elements:
+        key = classify_osm_element(el.get("tags", {}))
+        if not key:
+            continue
+        if "geometry" in el:
+            points = [(p["lat"], p["lon"]) for p in el["geometry"] if p]
+        elif "lat" in el and "lon" in el:
+            points = [(el["lat"], el["lon"])]
+        else:
+            points = []
+        if points:
+            amenities.append((key, points))
+    return amenities
+
+
+def _segment_distance_sq(px, py, x1, y1, x2, y2):
+    """Squared distance from point p to segment (x1, y1)-(x2, y2)"""
+    dx, dy = x2 - x1, y2 - y1
+    length_sq = dx * dx + dy * dy
+    t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / length_sq))
+    cx, cy = x1 + t * dx - px, y1 + t * dy - py
+    return cx * cx + cy * cy
+
+
+def cells_within(points, radius, rows, cols, cell_m):
+    """
+    Indices of cells whose center lies within radius meters of a point or
+    polyline, given in meters from the grid's south-west corner.
+    """
+    radius_sq = radius * radius
+    segments = list(zip(points, points[1:])) or [(points[0], points[0])]
+    cells = set()
+    for (x1, y1), (x2, y2) in segments:
+        row_lo = max(0, math.floor((min(y1, y2) - radius) / cell_m))
+        row_hi = min(rows - 1, math.floor((max(y1, y2) + radius) / cell_m))
+        col_lo = max(0, math.floor((min(x1, x2) - radius) / cell_m))
+        col_hi = min(cols - 1, math.floor((max(x1, x2) + radius) / cell_m))
+        for row in range(row_lo, row_hi + 1):
+            cy = (row + 0.5) * cell_m
+            base = row * cols
+            for col in range(col_lo, col_hi + 1):
+                if base + col not in cells and \
+                        _segment_distance_sq((col + 0.5) * cell_m, cy, x1, y1, x2, y2) <= radius_sq:
+                    cells.add(base + col)
+    return cells
+
+
+def build_grid(amenities, south, west, north, east, cell_m=INFRA_GRID_CELL_M):
+    """
+    Stamp amenities ([(key, [(lat, lon), ...])]) onto a grid covering the
+    bounding box; each one counts once per cell within its radius.
+    Returns (header values, record bytes).
+    """
+    mid_lat = math.radians((south + north) / 2)
+    cell_lat = cell_m / METERS_PER_DEGREE
+    cell_lon = cell_m / (METERS_PER_DEGREE * math.cos(mid_lat))
+    rows = max(1, math.ceil((north - south) / cell_lat))
+    cols = max(1, math.ceil((east - west) / cell_lon))
+
+    counts = {key: [0] * (rows * cols) for key in COUNT_KEYS}
+    meters_per_lon = METERS_PER_DEGREE * math.cos(mid_lat)
+
+    for key, points in amenities:
+        radius = INFRA_ROAD_RADIUS_M if key == "roads_nearby" else INFRA_AMENITY_RADIUS_M
+        # Local meters from the south-west corner; one cell is cell_m on both axes
+        points_m = [((lon - west) * meters_per_lon, (lat - south) * METERS_PER_DEGREE) for lat, lon in points]
+        column = counts[key]
+        for index in cells_within(points_m, radius, rows, cols, cell_m):
+            column[index] += 1
+
+    records = bytearray(RECORD.size * rows * cols)
+    for i in range(rows * cols):
+        infrastructure = {key: min(counts[key][i], MAX_COUNT) for key in COUNT_KEYS}
+        subscores = get_infrastructure_subscores(infrastructure)
+        RECORD.pack_into(
+            records, i * RECORD.size,
+            *(infrastructure[key] for key in COUNT_KEYS),
+            *(subscores[key] for key in SUBSCORE_KEYS),
+            get_road_adjustment(infrastructure["roads_nearby"])
+        )
+
+    header = (south, west, north, east, rows, cols, cell_lat, cell_lon, cell_m)
+    return header, bytes(records)
+
+
+def save_grid(path, header, records):
+    """Write the grid file atomically"""
+    south, west, north, east, rows, cols, cell_lat, cell_lon, cell_m = header
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(
+            GRID_MAGIC, GRID_VERSION, 0, cell_m,
+            south, west, north, east, rows, cols, cell_lat, cell_lon
+        ))
+        f.write(records)
+    os.replace(tmp_path, path)
+
+
+class InfraGrid:
+    """Read-only, memory-mapped view of a precomputed infrastructure grid"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self.cell_m, self.south, self.west, self.north, self.east,
+         self.rows, self.cols, self.cell_lat, self.cell_lon) = HEADER.unpack_from(self._mm, 0)
+        if magic != GRID_MAGIC or version != GRID_VERSION:
+            raise ValueError(f"{path} is not a version {GRID_VERSION} infrastructure grid")
+
+    def _cell_offset(self, row, col):
+        return HEADER.size + (row * self.cols + col) * RECORD.size
+
+    def _cell_index(self, lat, lon):
+        row = int((lat - self.south) / self.cell_lat)
+        col = int((lon - self.west) / self.cell_lon)
+        if lat < self.south or lon < self.west or row >= self.rows or col >= self.cols:
+            return None
+        return row, col
+
+    def lookup(self, lat, lon):
+        """Infrastructure counts around a coordinate, or None if outside the grid"""
+        cell = self._cell_index(lat, lon)
+        if cell is None:
+            return None
+        values = RECORD.unpack_from(self._mm, self._cell_offset(*cell))
+        return dict(zip(COUNT_KEYS, values[:5]))
+
+    def subscores(self, lat, lon):
+        """Capped infrastructure sub-scores and road adjustment, or None if outside the grid"""
+        cell = self._cell_index(lat, lon)
+        if cell is None:
+            return None
+        values = RECORD.unpack_from(self._mm, self._cell_offset(*cell))
+        scores = dict(zip(SUBSCORE_KEYS, values[5:9]))
+        scores["road_adjustment"] = values[9]
+        return scores
+
+    def tile(self, south, west, north, east, max_cells=256):
+        """
+        Infrastructure score (capped sub-scores + road adjustment) for cells
+        intersecting a bounding box, clipped to the grid and strided so each
+        side has at most max_cells values. Rows run south to north.
+        """
+        row_lo = max(0, int((south - self.south) / self.cell_lat))
+        row_hi = min(self.rows - 1, int((north - self.south) / self.cell_lat))
+        col_lo = max(0, int((west - self.west) / self.cell_lon))
+        col_hi = min(self.cols - 1, int((east - self.west) / self.cell_lon))
+        if row_lo > row_hi or col_lo > col_hi:
+            return None
+
+        step = max(1, math.ceil(max(row_hi - row_lo + 1, col_hi - col_lo + 1) / max_cells))
+        scores = []
+        for row in range(row_lo, row_hi + 1, step):
+            line = []
+            for col in range(col_lo, col_hi + 1, step):
+                values = RECORD.unpack_from(self._mm, self._cell_offset(row, col))
+                line.append(sum(values[5:]))
+            scores.append(line)
+
+        return {
+            "south": self.south + row_lo * self.cell_lat,
+            "west": self.west + col_lo * self.cell_lon,
+            "cell_lat_deg": self.cell_lat * step,
+            "cell_lon_deg": self.cell_lon * step,
+            "rows": len(scores),
+            "cols": len(scores[0]) if scores else 0,
+            "scores": scores
+        }
+
+    def close(self):
+        self._mm.close()
+
+
+_grid_lock = threading.Lock()
+_grids = {}
+
+
+def load_grid(path=INFRA_GRID_FILE):
+    """
+    Return the mapped grid for path, or None if it doesn't exist. The grid is
+    remapped when the file has been rebuilt; the file is stat'ed at most
+    every INFRA_GRID_CHECK_INTERVAL_S.
+    """
+    now = time.monotonic()
+    with _grid_lock:
+        cached = _grids.setdefault(path, {"grid": None, "identity": None, "checked_at": -math.inf})
+        if now - cached["checked_at"] < INFRA_GRID_CHECK_INTERVAL_S:
+            return cached["grid"]
+        cached["checked_at"] = now
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            cached["grid"], cached["identity"] = None, None
+            return None
+
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if identity != cached["identity"]:
+            cached["identity"] = identity
+            try:
+                # The old mapping stays valid for requests still reading it
+                cached["grid"] = InfraGrid(path)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not map infrastructure grid - {e}")
+                cached["grid"] = None
+        return cached["grid"]
+
+
+def get_infrastructure(lat, lon):
+    """Infrastructure from the precomputed grid when it covers the point, else a live Overpass query"""
+    grid = load_grid()
+    if grid is not None:
+        infrastructure = grid.lookup(lat, lon)
+        if infrastructure is not None:
+            return infrastructure
+    return fetch_infrastructure_data(lat=lat, lon=lon)
+
+
+def tile_bounds(z, x, y):
+    """Bounding box (south, west, north, east) of a slippy-map tile"""
+    n = 2 ** z
+    west = x / n * 360 - 180
+    east = (x + 1) / n * 360 - 180
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+
+def main():
+    """CLI Entry point"""
+    parser = argparse.ArgumentParser(description="Precompute a city infrastructure grid")
+    parser.add_argument("--bbox", required=True, help="south,west,north,east in degrees")
+    parser.add_argument("--cell", type=float, default=INFRA_GRID_CELL_M, help="Cell size in meters")
+    parser.add_argument("--output", default=INFRA_GRID_FILE)
+    args = parser.parse_args()
+
+    south, west, north, east = (float(v) for v in args.bbox.split(","))
+
+    print("🏗️ Fetching city infrastructure from OpenStreetMap...")
+    amenities = fetch_city_amenities(south, west, north, east)
+    print(f"   ✓ {len(amenities)} amenities and roads")
+
+    print("🧮 Building grid...")
+    header, records = build_grid(amenities, south, west, north, east, args.cell)
+    save_grid(args.output, header, records)
+    print(f"   ✓ {header[4]}x{header[5]} cells saved to {args.output} ({len(records) // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Load-testing harness for the Flask server
+
+Starts local stub servers that imitate SerpAPI, Overpass and Gemini (with
+realistic latency and 429/504 behaviour), points the app at them and drives
+/api/analyze at a configurable concurrency and hot/cold hotel mix.
+
+Usage:
+    python loadtest.py --concurrency 16 --requests 200 --hot-ratio 0.8
+    python loadtest.py --target http://localhost:5001 --serpapi-port 9101 ...
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+
+# Latency profiles (seconds) and failure rates for each upstream stub.
+# Latency is log-normal around the median, which matches the long tail
+# we see from the real services.
+UPSTREAM_PROFILES = {
+    "serpapi": {"median": 1.2, "sigma": 0.4, "rate_limit": 0.02, "timeout": 0.0},
+    "overpass": {"median": 2.0, "sigma": 0.7, "rate_limit": 0.05, "timeout": 0.03},
+    "gemini": {"median": 3.0, "sigma": 0.5, "rate_limit": 0.02, "timeout": 0.0},
+}
+
+HOT_HOTELS = [
+    "Radisson Kharadi",
+    "Hyatt Pune",
+    "Novotel Pune Viman Nagar",
+    "JW Marriott Pune",
+    "The Westin Pune Koregaon Park",
+]
+
+
+class StubStats:
+    """Thread-safe per-service call and error counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.errors = {}
+
+    def record(self, service, status):
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+            if status != 200:
+                key = f"{service}:{status}"
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.calls), dict(self.errors)
+
+
+def _fake_local_results(query, count=5):
+    rng = random.Random(query)
+    results = []
+    for i in range(count):
+        results.append({
+            "title": query if i == 0 else f"{query} Annex {i}",
+            "data_id": f"0x{rng.getrandbits(64):016x}:0x{rng.getrandbits(64):016x}",
+            "rating": round(rng.uniform(3.0, 4.9), 1),
+            "reviews": rng.randint(50, 20000),
+            "address": "Stub Road, Pune, Maharashtra",
+            "gps_coordinates": {
+                "latitude": 18.55 + rng.uniform(-0.02, 0.02),
+                "longitude": 73.94 + rng.uniform(-0.02, 0.02)
+            },
+            "type": ["Hotel"]
+        })
+    return results
+
+
+def _fake_reviews(count=20):
+    phrases = [
+        "Great stay, very clean rooms and helpful staff.",
+        "Room was dirty and we found a cockroach in the bathroom.",
+        "Felt safe walking around the area at night.",
+        "Breakfast was terrible but location is good.",
+        "Excellent security at the entrance, family friendly.",
+    ]
+    return [{
+        "rating": random.randint(1, 5),
+        "snippet": random.choice(phrases),
+        "date": "a month ago",
+        "user": {"name": f"Guest {i}"}
+    } for i in range(count)]
+
+
+def _fake_organic_results(query, count):
+    results = []
+    for i in range(count):
+        # Combined Twitter/X + Reddit queries get an even mix of both
+        if "reddit.com" in query and ("twitter.com" not in query or i % 2):
+            results.append({
+                "title": f"Stayed at this hotel? r/pune thread {i}",
+                "snippet": "Anyone stayed here recently? Is the area safe for families?",
+                "link": f"https://www.reddit.com/r/pune/comments/{i}"
+            })
+        else:
+            results.append({
+                "title": f"guest{i} on X: loved the stay",
+                "snippet": "Lovely hotel, staff were great and the rooms were clean.",
+                "link": f"https://x.com/guest{i}/status/{i}"
+            })
+    return results
+
+
+def _fake_gemini_text():
+    return json.dumps({
+        "assessment": random.choice(["Safe", "Moderate"]),
+        "concerns": ["Some hygiene complaints in recent reviews"],
+        "positives": ["Security staff at entrance", "Hospitals nearby"],
+        "recommendations": ["Request a room on a higher floor"],
+        "confidence_score": random.randint(60, 90)
+    })
+
+
+def make_stub_handler(service, stats, latency_scale):
+    """Build a request handler class imitating one upstream service"""
+    profile = UPSTREAM_PROFILES[service]
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _simulate(self):
+            delay = random.lognormvariate(0, profile["sigma"]) * profile["median"]
+            time.sleep(delay * latency_scale)
+            roll = random.random()
+            if roll < profile["rate_limit"]:
+                return 429
+            if roll < profile["rate_limit"] + profile["timeout"]:
+                return 504
+            return 200
+
+        def _handle(self):
+            status = self._simulate()
+            stats.record(service, status)
+            if status != 200:
+                self._reply(status, {"error": f"Stub {service} returned {status}"})
+                return
+            self._reply(200, self._body())
+
+        def _body(self):
+            if service == "serpapi":
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                engine = params.get("engine")
+                if engine == "google_maps":
+                    return {"local_results": _fake_local_results(params.get("q", ""))}
+                if engine == "google_maps_reviews":
+                    return {"reviews": _fake_reviews()}
+                return {"organic_results": _fake_organic_results(
+                    params.get("q", ""), int(params.get("num", 10))
+                )}
+            if service == "overpass":
+                elements = (
+                    [{"type": "node", "tags": {"amenity": "hospital"}}] * random.randint(0, 12)
+                    + [{"type": "node", "tags": {"amenity": "police"}}] * random.randint(0, 3)
+                    + [{"type": "way", "tags": {"highway": "secondary"}}] * random.randint(0, 300)
+                )
+                return {"elements": elements}
+            return {"candidates": [{"content": {"parts": [{"text": _fake_gemini_text()}]}}]}
+
+        def do_GET(self):
+            self._handle()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            self._handle()
+
+    return StubHandler
+
+
+def start_stub_servers(stats, latency_scale=1.0, host="127.0.0.1", ports=None):
+    """Start one stub server per upstream service; returns {service: (server, base_url)}"""
+    ports = ports or {}
+    servers = {}
+    for service in UPSTREAM_PROFILES:
+        server = ThreadingHTTPServer(
+            (host, ports.get(service, 0)),
+            make_stub_handler(service, stats, latency_scale)
+        )
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers[service] = (server, f"http://{host}:{server.server_address[1]}")
+    return servers
+
+
+def point_app_at_stubs(servers, state_dir):
+    """
+    Export upstream URLs so config.py picks up the stubs on import, keep the
+    app's caches, indexes and history in state_dir so every run starts cold,
+    and turn off background refreshes so only /api/analyze calls are counted
+    """
+    os.environ["SERPAPI_URL"] = servers["serpapi"][1]
+    os.environ["OVERPASS_URL"] = servers["overpass"][1] + "/api/interpreter"
+    os.environ["OVERPASS_FALLBACK_URL"] = servers["overpass"][1] + "/api/interpreter"
+    os.environ["GEMINI_API_URL"] = servers["gemini"][1] + "/v1beta/models/stub:generateContent"
+    os.environ.setdefault("SERPAPI_KEY", "stub-key")
+    os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+    os.environ["REPORT_CACHE_DIR"] = os.path.join(state_dir, "report_cache")
+    os.environ["NAME_INDEX_FILE"] = os.path.join(state_dir, "name_index.jsonl")
+    os.environ["HISTORY_DIR"] = os.path.join(state_dir, "score_history")
+    os.environ["SNAPSHOT_FILE"] = os.path.join(state_dir, "reports.snapshot")
+    os.environ["INFRA_GRID_FILE"] = os.path.join(state_dir, "infra_grid.bin")
+    # Background refreshes would add upstream calls not made by /api/analyze
+    os.environ["REFRESH_SCHEDULER_ENABLED"] = "0"
+
+
+def start_app_server(host="127.0.0.1", port=0):
+    """Run the Flask app in-process on a threaded WSGI server"""
+    from werkzeug.serving import make_server
+    from server import app
+
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def build_request_mix(total, hot_ratio, seed=None):
+    """Return the list of hotel names to request: hot names repeat, cold names are unique"""
+    rng = random.Random(seed)
+    mix = []
+    for i in range(total):
+        if rng.random() < hot_ratio:
+            mix.append(rng.choice(HOT_HOTELS))
+        else:
+            mix.append(f"Cold Hotel {i} {rng.getrandbits(32):08x}")
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_load(target, hotels, concurrency, timeout=300):
+    """Drive /api/analyze with the given hotel names; returns per-request results"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    def one(hotel_name):
+        started = time.perf_counter()
+        try:
+            response = session.post(
+                f"{target}/api/analyze",
+                json={"hotel_name": hotel_name},
+                timeout=timeout
+            )
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        return hotel_name, status, time.perf_counter() - started
+
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(one, name) for name in hotels]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return results
+
+
+def summarize(results, wall_time, upstream_calls, upstream_errors, hotels):
+    """Compute throughput, latency percentiles, error rates and upstream amplification"""
+    latencies = sorted(r[2] for r in results)
+    statuses = {}
+    for _, status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    completed = len(results)
+    failed = completed - statuses.get("200", 0)
+    total_upstream = sum(upstream_calls.values())
+
+    return {
+        "requests": completed,
+        "unique_hotels": len(set(hotels)),
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(completed / wall_time, 3) if wall_time else 0,
+        "latency_s": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p90": round(percentile(latencies, 90), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0
+        },
+        "status_counts": statuses,
+        "error_rate": round(failed / completed, 4) if completed else 0,
+        "upstream_calls": upstream_calls,
+        "upstream_errors": upstream_errors,
+        "upstream_calls_per_request": round(total_upstream / completed, 3) if completed else 0,
+        "upstream_calls_per_request_by_service": {
+            service: round(count / completed, 3) if completed else 0
+            for service, count in upstream_calls.items()
+        }
+    }
+
+
+def print_load_summary(summary):
+    """Print load-test summary to console"""
+    print("\n" + "="*60)
+    print("📈 LOAD TEST RESULTS")
+    print("="*60)
+    print(f"Requests: {summary['requests']} ({summary['unique_hotels']} unique hotels)")
+    print(f"Wall time: {summary['wall_time_s']}s")
+    print(f"Throughput: {summary['throughput_rps']} req/s")
+    latency = summary["latency_s"]
+    print(f"Latency: p50={latency['p50']}s p90={latency['p90']}s "
+          f"p95={latency['p95']}s p99={latency['p99']}s max={latency['max']}s")
+    print(f"Error rate: {summary['error_rate']:.2%} {summary['status_counts']}")
+    print(f"\n🔁 Upstream calls per request: {summary['upstream_calls_per_request']}")
+    for service, ratio in summary["upstream_calls_per_request_by_service"].items():
+        print(f"   - {service}: {ratio}")
+    if summary["upstream_errors"]:
+        print(f"   Upstream errors: {summary['upstream_errors']}")
+    print("="*60)
+
+
+def main():
+    """CLI Entry point"""
+    parser = argparse.ArgumentParser(description="Load-test the safety analyzer server")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--hot-ratio", type=float, default=0.8,
+                        help="Share of requests for a small set of popular hotels")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiply stub latencies (e.g. 0.1 for a quick smoke run)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--target", default=None,
+                        help="Base URL of an already running server (its upstream URLs must "
+                             "point at the stubs); default runs the app in-process")
+    parser.add_argument("--serpapi-port", type=int, default=0)
+    parser.add_argument("--overpass-port", type=int, default=0)
+    parser.add_argument("--gemini-port", type=int, default=0)
+    parser.add_argument("--json", dest="json_output", default=None,
+                        help="Write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    stats = StubStats()
+    servers = start_stub_servers(stats, args.latency_scale, ports={
+        "serpapi": args.serpapi_port,
+        "overpass": args.overpass_port,
+        "gemini": args.gemini_port
+    })
+    for service, (_, url) in servers.items():
+        print(f"🧪 {service} stub listening on {url}")
+
+    app_server = None
+    state_dir = None
+    target = args.target
+    if target is None:
+        state_dir = tempfile.mkdtemp(prefix="loadtest_")
+        point_app_at_stubs(servers, state_dir)
+        app_server, target = start_app_server()
+        print(f"🔥 App running in-process on {target}")
+
+    hotels = build_request_mix(args.requests, args.hot_ratio, args.seed)
+    print(f"🚀 Sending {len(hotels)} requests at concurrency {args.concurrency}...")
+
+    started = time.perf_counter()
+    results = run_load(target, hotels, args.concurrency)
+    wall_time = time.perf_counter() - started
+
+    upstream_calls, upstream_errors = stats.snapshot()
+    summary = summarize(results, wall_time, upstream_calls, upstream_errors, hotels)
+    print_load_summary(summary)
+
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=4)
+        print(f"\n📄 Summary saved to: {args.json_output}")
+
+    if app_server:
+        app_server.shutdown()
+    if state_dir:
+        shutil.rmtree(state_dir, ignore_errors=True)
+    for server, _ in servers.values():
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Load test interrupted by user")
@@ -1,12 +1,14 @@
 """
 Hotel Safety Analyzer - Main Application
 """
+import argparse
 from data_fetchers import (
     fetch_google_maps_data,
-    fetch_twitter_reviews,
-    fetch_reddit_reviews,
-    fetch_infrastructure_data
+    fetch_social_reviews
 )
+from infra_grid import get_infrastructure
+from reviews import ReviewBatch
+from score_history import record_report
 from ai_analyzer import analyze_with_genai
 from safety_scorer import (
     calculate_safety_score,
@@ -21,7 +23,20 @@ from report_generator import (
 )
 
 
-from config import QUERY, LOCATION, LAT, LON
+from config import QUERY, LOCATION, LAT, LON, BATCH_WORKERS, AREA_RANKING_TOP_K, AREA_RANKING_MAX_TOP_K
+
+def get_place_coordinates(place_data):
+    """Return (lat, lon) for a place, falling back to the configured defaults"""
+    lat, lon = LAT, LON
+    if place_data.get("coordinates"):
+        try:
+            lat = place_data["coordinates"]["latitude"]
+            lon = place_data["coordinates"]["longitude"]
+            print(f"   ✓ Detected coordinates: {lat}, {lon}")
+        except KeyError:
+            print("   ⚠️  Could not parse coordinates, using defaults")
+    return lat, lon
+
 
 def run_analysis(query=QUERY, location_bias=LOCATION):
     """
@@ -41,40 +56,33 @@ def run_analysis(query=QUERY, location_bias=LOCATION):
         print(f"   ✗ {error_msg}")
         return {"error": error_msg}
     
+    return analyze_place(place_data, google_reviews)
+
+
+def analyze_place(place_data, google_reviews, infrastructure=None):
+    """
+    Run the analysis steps that follow the Google Maps lookup for one place.
+    Infrastructure is fetched unless already provided (e.g. shared between
+    nearby hotels). Returns the final report dictionary.
+    """
     # Extract coordinates from place data if available, otherwise use defaults
-    lat, lon = LAT, LON
-    if place_data.get("coordinates"):
-        try:
-            lat = place_data["coordinates"]["latitude"]
-            lon = place_data["coordinates"]["longitude"]
-            print(f"   ✓ Detected coordinates: {lat}, {lon}")
-        except KeyError:
-            print("   ⚠️  Could not parse coordinates, using defaults")
+    lat, lon = get_place_coordinates(place_data)
     
-    # Step 2: Fetch Twitter reviews
-    print("\n🐦 Fetching Twitter/X reviews...")
-    twitter_reviews = fetch_twitter_reviews(place_data["name"])
+    # Step 2-3: Fetch Twitter/X and Reddit mentions (one combined search)
+    print("\n🐦 Fetching Twitter/X and Reddit mentions...")
+    twitter_reviews, reddit_reviews = fetch_social_reviews(place_data["name"])
     print(f"   ✓ Found {len(twitter_reviews)} tweets")
-    
-    # Step 3: Fetch Reddit discussions
-    print("\n👾 Fetching Reddit discussions...")
-    reddit_reviews = fetch_reddit_reviews(place_data["name"])
     print(f"   ✓ Found {len(reddit_reviews)} Reddit posts")
     
     # Step 4: Fetch infrastructure data
-    print("\n🏗️ Fetching infrastructure data...")
-    # Use detected coordinates
-    infrastructure = fetch_infrastructure_data(lat=lat, lon=lon)
-    print(f"   ✓ Infrastructure data collected")
+    if infrastructure is None:
+        print("\n🏗️ Fetching infrastructure data...")
+        # Use detected coordinates (precomputed grid if it covers them)
+        infrastructure = get_infrastructure(lat, lon)
+        print(f"   ✓ Infrastructure data collected")
     
-    # Step 5: Combine all reviews
-    all_reviews = google_reviews + twitter_reviews
-    for reddit in reddit_reviews:
-        all_reviews.append({
-            "source": "Reddit",
-            "text": f"{reddit['title']} - {reddit['snippet']}",
-            "link": reddit["link"]
-        })
+    # Step 5: Combine all reviews (normalized once, shared by scorer, AI and report)
+    all_reviews = ReviewBatch.from_sources(google_reviews, twitter_reviews, reddit_reviews)
     
     print(f"\n📊 Total reviews collected: {len(all_reviews)}")
     
@@ -113,10 +121,46 @@ def run_analysis(query=QUERY, location_bias=LOCATION):
         score_breakdown=score_breakdown
     )
     
+    # Step 9: Record the run in the score history
+    record_report(final_report, all_reviews)
+    
     return final_report
 
 def main():
     """CLI Entry point"""
+    parser = argparse.ArgumentParser(description="Hotel Safety Analyzer")
+    parser.add_argument("--batch", metavar="HOTELS_FILE",
+                        help="CSV or JSONL file of hotels (hotel_name, optional location)")
+    parser.add_argument("--output", default="batch_reports.jsonl",
+                        help="JSONL file receiving one report per hotel (batch mode)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS,
+                        help="Number of hotels analyzed in parallel (batch mode)")
+    parser.add_argument("--area", metavar="AREA_QUERY",
+                        help='Rank all hotels from one Maps search, e.g. "hotels in Kharadi"')
+    parser.add_argument("--location", default=LOCATION,
+                        help="Location bias for --area")
+    parser.add_argument("--top-k", type=int, default=AREA_RANKING_TOP_K,
+                        help="Candidates that get full review + AI analysis (area mode)")
+    args = parser.parse_args()
+
+    if args.area:
+        if not 0 <= args.top_k <= AREA_RANKING_MAX_TOP_K:
+            parser.error(f"--top-k must be between 0 and {AREA_RANKING_MAX_TOP_K}")
+        from area_ranking import rank_area, print_ranking
+        ranking = rank_area(args.area, location_bias=args.location, top_k=args.top_k)
+        if "error" in ranking:
+            print(f"\n❌ {ranking['error']}")
+            return
+        save_report(ranking, filename="area_ranking_report.json")
+        print_ranking(ranking)
+        return
+
+    if args.batch:
+        from batch import run_batch
+        succeeded, failed = run_batch(args.batch, args.output, workers=args.workers)
+        print(f"\n✅ Batch complete: {succeeded} succeeded, {failed} failed. Reports in {args.output}\n")
+        return
+
     report = run_analysis()
     if "error" in report:
         return
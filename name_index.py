@@ -0,0 +1,250 @@
+"""
+Hotel name resolution index
+
+Maps free-text hotel names (plus an optional location bias) to places we
+have already resolved through a Google Maps search, so typos and variants
+like "Radisson Kharadi" / "Radisson Blu Pune Kharadi" can skip the search.
+Matching uses padded word trigrams, and a query only matches a known name
+if it mentions every word of that name, so a partial query like "Marriott
+Pune" never resolves to a specific Marriott the index happens to know. The
+index grows from successful lookups and is persisted as an append-only
+JSONL log that is compacted once it holds mostly superseded records.
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from config import (
+    NAME_INDEX_FILE, NAME_INDEX_MIN_CONFIDENCE,
+    NAME_INDEX_MAX_DISTANCE_KM, NAME_INDEX_TTL_DAYS,
+    NAME_INDEX_AMBIGUITY_MARGIN, NAME_INDEX_MIN_TOKEN_SIMILARITY,
+    NAME_INDEX_COMPACT_FACTOR
+)
+
+STOPWORDS = {"hotel", "hotels", "the", "and", "by", "a", "an", "of", "at", "in"}
+
+
+def normalize_name(name):
+    """Lowercase, strip accents and punctuation, and drop filler words"""
+    name = unicodedata.normalize("NFKD", name or "")
+    name = "".join(ch for ch in name if not unicodedata.combining(ch)).lower()
+    tokens = re.findall(r"[a-z0-9]+", name)
+    # Keep filler words if they are all there is (e.g. "The Hotel")
+    return " ".join([token for token in tokens if token not in STOPWORDS] or tokens)
+
+
+def trigrams(normalized):
+    """Padded trigrams of each word in a normalized name"""
+    grams = set()
+    for token in normalized.split():
+        grams.update(token_trigrams(token))
+    return grams
+
+
+def token_trigrams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def dice(grams_a, grams_b):
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def covers_alias(query_normalized, alias):
+    """True if every word of the alias appears in the query, allowing typos"""
+    query_tokens = [token_trigrams(token) for token in query_normalized.split()]
+    return all(
+        any(dice(alias_token, query_token) >= NAME_INDEX_MIN_TOKEN_SIMILARITY for query_token in query_tokens)
+        for alias_token in map(token_trigrams, alias.split())
+    )
+
+
+def name_similarity(query_normalized, alias):
+    """
+    Trigram Dice similarity between a normalized query and alias, or 0 when
+    the query leaves out a word of the alias. Extra words in the query are
+    only penalized through Dice.
+    """
+    if not covers_alias(query_normalized, alias):
+        return 0.0
+    return dice(trigrams(query_normalized), trigrams(alias))
+
+
+def parse_location_bias(location):
+    """Extract (lat, lon) from an "@lat,lng,zoomz" location bias, or None"""
+    match = re.match(r"\s*@?\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)", location or "")
+    if not match:
+        return None
+    return float(match.group(1)), float(match.group(2))
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two coordinates"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 6371 * 2 * math.asin(math.sqrt(a))
+
+
+class NameIndex:
+    """Fuzzy index of resolved places, keyed by data_id"""
+
+    def __init__(self, path=NAME_INDEX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._places = {}   # data_id -> {"place": place_data, "aliases": [...], "resolved_at": ts}
+        self._grams = {}    # trigram -> set of (data_id, alias)
+        self._log_records = 0
+        self._load()
+        with self._lock:
+            self._maybe_compact()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written last line
+                self._apply(record["data_id"], record["place"], record["aliases"], record["resolved_at"])
+                self._log_records += 1
+
+    def _apply(self, data_id, place_data, aliases, resolved_at):
+        entry = self._places.setdefault(data_id, {"place": place_data, "aliases": [], "resolved_at": 0})
+        entry["place"] = place_data
+        entry["resolved_at"] = resolved_at
+        for alias in aliases:
+            if alias not in entry["aliases"]:
+                entry["aliases"].append(alias)
+                self._index_alias(data_id, alias)
+
+    def _index_alias(self, data_id, alias):
+        for gram in trigrams(alias):
+            self._grams.setdefault(gram, set()).add((data_id, alias))
+
+    def _append(self, record):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._log_records += 1
+
+    def _maybe_compact(self):
+        """
+        Rewrite the log with one record per place once most of it is
+        superseded. Records another process appends during the rewrite can be
+        lost; that only costs a repeat search.
+        """
+        if self._log_records <= max(100, NAME_INDEX_COMPACT_FACTOR * len(self._places)):
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for data_id, entry in self._places.items():
+                    f.write(json.dumps({
+                        "data_id": data_id,
+                        "place": entry["place"],
+                        "aliases": entry["aliases"],
+                        "resolved_at": entry["resolved_at"]
+                    }, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            self._log_records = len(self._places)
+        except OSError as e:
+            print(f"   ⚠️ Could not compact name index: {e}")
+
+    def resolve(self, query, location=None, min_confidence=NAME_INDEX_MIN_CONFIDENCE):
+        """
+        Return (place_data, confidence) for the best confident match,
+        or (None, best_confidence) when nothing clears the threshold.
+        """
+        normalized = normalize_name(query)
+        query_grams = trigrams(normalized)
+        single_word = len(normalized.split()) < 2
+        bias = parse_location_bias(location)
+        expiry = time.time() - NAME_INDEX_TTL_DAYS * 86400
+
+        with self._lock:
+            candidates = set()
+            for gram in query_grams:
+                candidates.update(self._grams.get(gram, ()))
+
+            scores = {}  # data_id -> best alias confidence
+            for data_id, alias in candidates:
+                entry = self._places[data_id]
+                if entry["resolved_at"] < expiry:
+                    continue
+                if alias == normalized:
+                    confidence = 1.0
+                elif single_word:
+                    continue  # A bare brand name ("Radisson") is too ambiguous to fuzzy-match
+                else:
+                    confidence = name_similarity(normalized, alias)
+                if confidence <= scores.get(data_id, 0.0):
+                    continue
+                coordinates = entry["place"].get("coordinates") or {}
+                if bias and "latitude" in coordinates:
+                    far = distance_km(bias[0], bias[1], coordinates["latitude"], coordinates["longitude"])
+                    if far > NAME_INDEX_MAX_DISTANCE_KM:
+                        continue
+                scores[data_id] = confidence
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            if not ranked:
+                return None, 0.0
+            best_id, best_confidence = ranked[0]
+            # Two places scoring almost the same means the query is ambiguous
+            if len(ranked) > 1 and best_confidence < 1.0 and best_confidence - ranked[1][1] < NAME_INDEX_AMBIGUITY_MARGIN:
+                return None, best_confidence
+            best = self._places[best_id]["place"]
+
+        if best_confidence >= min_confidence:
+            return dict(best), best_confidence
+        return None, best_confidence
+
+    def add(self, place_data, query=None):
+        """Record a resolved place under its official name and the query that found it"""
+        data_id = place_data.get("data_id")
+        if not data_id or not place_data.get("name"):
+            return
+
+        aliases = {normalize_name(place_data["name"])}
+        if query:
+            aliases.add(normalize_name(query))
+        aliases.discard("")
+
+        record = {
+            "data_id": data_id,
+            "place": place_data,
+            "aliases": sorted(aliases),
+            "resolved_at": time.time()
+        }
+        with self._lock:
+            # Nothing new to learn: same place data, known aliases, not yet half-way to expiry
+            entry = self._places.get(data_id)
+            if (entry and entry["place"] == place_data and aliases.issubset(entry["aliases"])
+                    and record["resolved_at"] - entry["resolved_at"] < NAME_INDEX_TTL_DAYS * 86400 / 2):
+                return
+            self._apply(data_id, place_data, record["aliases"], record["resolved_at"])
+            try:
+                self._append(record)
+                self._maybe_compact()
+            except OSError as e:
+                print(f"   ⚠️ Could not save name index: {e}")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_name_index():
+    """Process-wide name index, loaded on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NameIndex()
+        return _index
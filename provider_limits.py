@@ -0,0 +1,33 @@
+"""
+Per-provider concurrency limits for upstream API calls
+
+Limits are off by default, so interactive server requests are not throttled
+against each other. Batch mode turns them on with enable_provider_limits();
+from then on they are shared by every thread in the process.
+"""
+import threading
+from contextlib import contextmanager
+from config import PROVIDER_CONCURRENCY
+
+_lock = threading.Lock()
+_semaphores = {}
+
+
+def enable_provider_limits(limits=None):
+    """Cap in-flight calls per provider (PROVIDER_CONCURRENCY by default); idempotent"""
+    limits = PROVIDER_CONCURRENCY if limits is None else limits
+    with _lock:
+        for provider, limit in limits.items():
+            if provider not in _semaphores:
+                _semaphores[provider] = threading.BoundedSemaphore(limit)
+
+
+@contextmanager
+def provider_slot(provider):
+    """Hold one of the provider's concurrency slots for the duration of a call"""
+    semaphore = _semaphores.get(provider)
+    if semaphore is None:
+        yield
+        return
+    with semaphore:
+        yield
@@ -0,0 +1,261 @@
+"""
+Popularity-driven background refresh of cached reports
+
+Tracks how often each hotel is requested (exponentially decayed counts) and
+refreshes the hottest hotels' reports ahead of cache expiry from a priority
+queue, preferring off-peak hours and spending at most a configured share of
+the upstream API quota.
+
+When the server runs several worker processes, only one of them (whichever
+holds the leader lock in REPORT_CACHE_DIR) runs the scheduler, so the quota
+share is spent once and each hotel is refreshed once. Every worker writes its
+request counts to REFRESH_POPULARITY_DIR each tick and the leader adds the
+other workers' counts to its own, so popularity reflects all traffic. The
+others keep trying the lock and take over if the leader exits.
+"""
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from report_cache import report_key, load_entry, cache_report
+from config import (
+    REPORT_CACHE_DIR,
+    REPORT_CACHE_TTL_S,
+    REFRESH_AHEAD_S,
+    REFRESH_HOT_SET_SIZE,
+    REFRESH_POPULARITY_HALF_LIFE_S,
+    REFRESH_POPULARITY_MAX_ENTRIES,
+    REFRESH_POPULARITY_SWEEP_EVERY,
+    REFRESH_POPULARITY_DIR,
+    REFRESH_OFF_PEAK_HOURS,
+    REFRESH_TICK_S,
+    UPSTREAM_CALLS_PER_HOUR,
+    REFRESH_QUOTA_SHARE,
+    UPSTREAM_CALLS_PER_ANALYSIS
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process runs its own scheduler
+    fcntl = None
+
+
+class RefreshScheduler:
+    """Background thread that keeps popular hotels' reports warm"""
+
+    def __init__(self, analyze=None):
+        self._analyze = analyze
+        self._lock = threading.Lock()
+        self._popularity = {}   # key -> (decayed count, last update ts, hotel_name, location)
+        self._new_keys = 0      # Hotels added since the last prune
+        self._thread = None
+        self._stop = threading.Event()
+        self._leader_lock = None
+        self._is_leader = False
+
+        # Token bucket of upstream calls available to refreshes
+        self._calls_per_second = UPSTREAM_CALLS_PER_HOUR * REFRESH_QUOTA_SHARE / 3600
+        self._bucket_size = max(UPSTREAM_CALLS_PER_ANALYSIS, self._calls_per_second * 3600)
+        self._tokens = 0.0
+        self._tokens_at = time.time()
+
+    def _decayed(self, count, updated_at, now):
+        return count * math.pow(0.5, (now - updated_at) / REFRESH_POPULARITY_HALF_LIFE_S)
+
+    def record_request(self, hotel_name, location=None):
+        """
+        Count one interactive request for a hotel. Clients choose the names,
+        so the table is pruned every REFRESH_POPULARITY_SWEEP_EVERY new hotels
+        and never grows far past REFRESH_POPULARITY_MAX_ENTRIES.
+        """
+        key = report_key(hotel_name, location)
+        now = time.time()
+        with self._lock:
+            if key not in self._popularity:
+                self._new_keys += 1
+            count, updated_at, _, _ = self._popularity.get(key, (0.0, now, None, None))
+            self._popularity[key] = (self._decayed(count, updated_at, now) + 1, now, hotel_name, location)
+            if self._new_keys >= REFRESH_POPULARITY_SWEEP_EVERY:
+                self._prune(now)
+
+    def _prune(self, now):
+        """Drop hotels nobody has asked for in a long time, then all but the most popular. Caller holds _lock."""
+        scored = [
+            (self._decayed(count, updated_at, now), key)
+            for key, (count, updated_at, _, _) in self._popularity.items()
+        ]
+        keep = {key for popularity, key in heapq.nlargest(REFRESH_POPULARITY_MAX_ENTRIES, scored) if popularity >= 0.01}
+        self._popularity = {key: value for key, value in self._popularity.items() if key in keep}
+        self._new_keys = 0
+
+    def hottest(self, limit=REFRESH_HOT_SET_SIZE):
+        """
+        Return [(popularity, key, hotel_name, location)] for the most requested
+        hotels. On the leader this includes the counts other workers flushed.
+        """
+        now = time.time()
+        merged = self._flushed_counts(now) if self._is_leader else {}
+        with self._lock:
+            self._prune(now)
+            for key, (count, updated_at, hotel_name, location) in self._popularity.items():
+                popularity = self._decayed(count, updated_at, now) + merged.get(key, (0.0,))[0]
+                merged[key] = (popularity, hotel_name, location)
+        return heapq.nlargest(limit, (
+            (popularity, key, hotel_name, location)
+            for key, (popularity, hotel_name, location) in merged.items()
+        ))
+
+    def _flush_path(self):
+        return os.path.join(REFRESH_POPULARITY_DIR, f"{os.getpid()}.json")
+
+    def flush_popularity(self):
+        """Write this worker's decayed request counts for the leader to merge"""
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            counts = {
+                key: [self._decayed(count, updated_at, now), hotel_name, location]
+                for key, (count, updated_at, hotel_name, location) in self._popularity.items()
+            }
+
+        os.makedirs(REFRESH_POPULARITY_DIR, exist_ok=True)
+        path = self._flush_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"flushed_at": now, "counts": counts}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _flushed_counts(self, now):
+        """
+        Sum the counts other workers flushed, decayed to now:
+        {key: (popularity, hotel_name, location)}. A file not rewritten for a
+        half-life belongs to a worker that has exited and is removed.
+        """
+        merged = {}
+        if not os.path.isdir(REFRESH_POPULARITY_DIR):
+            return merged
+        own = os.path.basename(self._flush_path())
+        for filename in os.listdir(REFRESH_POPULARITY_DIR):
+            if not filename.endswith(".json") or filename == own:
+                continue
+            path = os.path.join(REFRESH_POPULARITY_DIR, filename)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    flushed = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if now - flushed["flushed_at"] > REFRESH_POPULARITY_HALF_LIFE_S:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            for key, (count, hotel_name, location) in flushed["counts"].items():
+                popularity = self._decayed(count, flushed["flushed_at"], now) + merged.get(key, (0.0,))[0]
+                merged[key] = (popularity, hotel_name, location)
+        return merged
+
+    def _take_tokens(self, cost):
+        now = time.time()
+        self._tokens = min(self._bucket_size, self._tokens + (now - self._tokens_at) * self._calls_per_second)
+        self._tokens_at = now
+        if self._tokens < cost:
+            return False
+        self._tokens -= cost
+        return True
+
+    def due_refreshes(self, now=None):
+        """
+        Priority queue of hotels to refresh: hot hotels whose report expires
+        within REFRESH_AHEAD_S (or, off-peak, is past half its TTL), most
+        popular first, then soonest to expire.
+        """
+        now = now or time.time()
+        off_peak = datetime.fromtimestamp(now).hour in REFRESH_OFF_PEAK_HOURS
+        threshold = REPORT_CACHE_TTL_S - REFRESH_AHEAD_S
+        if off_peak:
+            threshold = min(threshold, REPORT_CACHE_TTL_S / 2)
+
+        queue = []
+        for popularity, key, hotel_name, location in self.hottest():
+            entry = load_entry(key)
+            age = now - entry["cached_at"] if entry else math.inf
+            if age >= threshold:
+                expires_at = entry["cached_at"] + REPORT_CACHE_TTL_S if entry else now
+                heapq.heappush(queue, (-popularity, expires_at, key, hotel_name, location))
+        return queue
+
+    def run_once(self):
+        """Refresh as many due hotels as the quota share allows; returns number refreshed"""
+        if self._analyze is None:
+            from main import run_analysis
+            self._analyze = run_analysis
+
+        queue = self.due_refreshes()
+        refreshed = 0
+        while queue and not self._stop.is_set():
+            if not self._take_tokens(UPSTREAM_CALLS_PER_ANALYSIS):
+                break
+            _, _, key, hotel_name, location = heapq.heappop(queue)
+            print(f"♻️ Pre-warming report for: {hotel_name}")
+            try:
+                report = self._analyze(query=hotel_name, location_bias=location)
+            except Exception as e:
+                print(f"Warning: Background refresh failed for {hotel_name} - {e}")
+                continue
+            if cache_report(hotel_name, location, report):
+                refreshed += 1
+        return refreshed
+
+    def _tick(self):
+        """Flush this worker's counts, then refresh if this worker is (or becomes) the leader"""
+        try:
+            self.flush_popularity()
+        except OSError as e:
+            print(f"Warning: Could not flush request counts - {e}")
+        if self._is_leader or self._become_leader():
+            self.run_once()
+
+    def _run(self):
+        self._become_leader()
+        while not self._stop.wait(REFRESH_TICK_S):
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"Warning: Refresh scheduler tick failed - {e}")
+
+    def _become_leader(self):
+        """Try to take the cross-process leader lock without blocking; held for the process lifetime"""
+        if fcntl is not None:
+            os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+            lock_file = open(os.path.join(REPORT_CACHE_DIR, ".refresh.lock"), "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._leader_lock = lock_file
+        self._is_leader = True
+        print("♻️ Refresh scheduler running in this process")
+        return True
+
+    def start(self):
+        """
+        Start the background thread. Idempotent and cheap. Every worker runs
+        it to flush request counts each REFRESH_TICK_S; only the leader
+        refreshes reports, and followers retry the lock on every tick.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+scheduler = RefreshScheduler()
@@ -0,0 +1,86 @@
+"""
+Disk-backed cache of finished reports, keyed by normalized hotel query
+"""
+import hashlib
+import json
+import os
+import time
+from name_index import normalize_name
+from config import REPORT_CACHE_DIR, REPORT_CACHE_TTL_S, LOCATION
+
+
+def report_key(hotel_name, location=None):
+    """Cache key for a hotel request"""
+    return f"{normalize_name(hotel_name)}|{location or LOCATION}"
+
+
+def _cache_path(key):
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(REPORT_CACHE_DIR, f"{digest}.json")
+
+
+def load_entry(key):
+    """Return the raw cache entry for key (any age), or None"""
+    try:
+        with open(_cache_path(key), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def cached_at(hotel_name, location=None):
+    """When the cached report for a request was written (from file mtime), or None"""
+    try:
+        return os.stat(_cache_path(report_key(hotel_name, location))).st_mtime
+    except OSError:
+        return None
+
+
+def get_cached_report(hotel_name, location=None, ttl=REPORT_CACHE_TTL_S):
+    """Return a cached report younger than ttl seconds, or None"""
+    entry = load_entry(report_key(hotel_name, location))
+    if entry and time.time() - entry["cached_at"] < ttl:
+        return entry["report"]
+    return None
+
+
+def cache_report(hotel_name, location, report):
+    """Store a successful report; failed reports are never cached"""
+    if "error" in report:
+        return False
+
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    key = report_key(hotel_name, location)
+    entry = {
+        "key": key,
+        "hotel_name": hotel_name,
+        "location": location or LOCATION,
+        "cached_at": time.time(),
+        "report": report
+    }
+    path = _cache_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        # mtime == cached_at lets readers check freshness with a stat
+        os.utime(tmp_path, (entry["cached_at"], entry["cached_at"]))
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        print(f"Warning: Could not cache report - {e}")
+        return False
+
+
+def iter_cache_entries():
+    """Yield every cache entry on disk"""
+    if not os.path.isdir(REPORT_CACHE_DIR):
+        return
+    for filename in os.listdir(REPORT_CACHE_DIR):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(REPORT_CACHE_DIR, filename), encoding="utf-8") as f:
+                yield json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
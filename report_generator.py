@@ -4,6 +4,7 @@ Report generation and output functions
 import json
 from datetime import datetime
 from config import OUTPUT_FILE, MAX_REVIEWS_TO_ANALYZE
+from reviews import review_dicts
 
 
 def generate_report(place_data, all_reviews, infrastructure, safety_score, 
@@ -25,7 +26,7 @@ def generate_report(place_data, all_reviews, infrastructure, safety_score,
         },
         "negative_review_count": negative_hits,
         "ai_analysis": ai_analysis,
-        "all_reviews": all_reviews[:MAX_REVIEWS_TO_ANALYZE],
+        "all_reviews": review_dicts(all_reviews, MAX_REVIEWS_TO_ANALYZE),
         "generated_at": datetime.now().isoformat(),
         "analysis_metadata": {
             "version": "2.0",
@@ -0,0 +1,177 @@
+"""
+Memory-mapped read-only snapshot of the latest report for every hotel
+
+The builder packs pre-serialized JSON for each cached report into one
+immutable file with a sorted hash index keyed by data_id and by the report
+cache's normalized name + location key. Server workers map the same file, so it is shared through the page
+cache, and answer hits by returning the stored bytes without re-encoding.
+Rebuilding writes a new file and atomically renames it over the old one;
+readers notice the new inode and remap.
+
+Usage:
+    python report_snapshot.py            # rebuild from the report cache
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from report_cache import iter_cache_entries, report_key
+from config import SNAPSHOT_FILE, SNAPSHOT_CHECK_INTERVAL_S
+
+SNAPSHOT_MAGIC = b"RSNP"
+SNAPSHOT_VERSION = 2  # v2: name keys include the location bias
+HEADER = struct.Struct("<4sHHIQQ")  # magic, version, pad, entry count, index offset, keys offset
+# key hash, key offset, key length, blob offset, blob length, cached_at
+INDEX_ENTRY = struct.Struct("<QQHQId")
+
+
+def _key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def snapshot_keys(entry):
+    """
+    Index keys for a cache entry: its data_id plus the request and hotel
+    names, each combined with the location the report was made for
+    """
+    hotel_info = entry["report"].get("hotel_info", {})
+    keys = {f"name:{report_key(entry['hotel_name'], entry.get('location'))}"}
+    if hotel_info.get("name"):
+        keys.add(f"name:{report_key(hotel_info['name'], entry.get('location'))}")
+    if hotel_info.get("data_id"):
+        keys.add(f"id:{hotel_info['data_id']}")
+    return keys
+
+
+def build_snapshot(path=SNAPSHOT_FILE, entries=None):
+    """Pack the newest report per key into a snapshot file; returns number of reports"""
+    # Newest report wins for every key
+    latest = {}
+    for entry in (entries if entries is not None else iter_cache_entries()):
+        for key in snapshot_keys(entry):
+            if key not in latest or entry["cached_at"] > latest[key]["cached_at"]:
+                latest[key] = entry
+
+    blobs, blob_ids = [], {}
+    for entry in latest.values():
+        if id(entry) not in blob_ids:
+            blob_ids[id(entry)] = len(blobs)
+            blobs.append(json.dumps(entry["report"], ensure_ascii=False, sort_keys=True,
+                                    separators=(",", ":")).encode("utf-8"))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        blob_offsets = []
+        for blob in blobs:
+            blob_offsets.append(f.tell())
+            f.write(blob)
+
+        keys_offset = f.tell()
+        index = []
+        for key, entry in latest.items():
+            encoded = key.encode("utf-8")
+            blob = blob_ids[id(entry)]
+            index.append((_key_hash(key), f.tell(), len(encoded),
+                          blob_offsets[blob], len(blobs[blob]), entry["cached_at"]))
+            f.write(encoded)
+
+        index_offset = f.tell()
+        for row in sorted(index):
+            f.write(INDEX_ENTRY.pack(*row))
+
+        f.seek(0)
+        f.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(index), index_offset, keys_offset))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+    return len(blobs)
+
+
+class ReportSnapshot:
+    """Read-only mapping of a snapshot file"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.identity = (os.fstat(f.fileno()).st_ino, os.fstat(f.fileno()).st_mtime_ns)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.count, self._index_offset, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} report snapshot")
+
+    def _entry(self, position):
+        return INDEX_ENTRY.unpack_from(self._mm, self._index_offset + position * INDEX_ENTRY.size)
+
+    def get(self, key):
+        """Return (json bytes, cached_at) for a key, or None"""
+        target = _key_hash(key)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        encoded = key.encode("utf-8")
+        while lo < self.count:
+            key_hash, key_offset, key_length, blob_offset, blob_length, cached_at = self._entry(lo)
+            if key_hash != target:
+                break
+            if self._mm[key_offset:key_offset + key_length] == encoded:
+                return self._mm[blob_offset:blob_offset + blob_length], cached_at
+            lo += 1
+        return None
+
+    def get_by_name(self, hotel_name, location=None):
+        return self.get(f"name:{report_key(hotel_name, location)}")
+
+    def get_by_data_id(self, data_id):
+        return self.get(f"id:{data_id}")
+
+
+_lock = threading.Lock()
+_current = {"snapshot": None, "checked_at": 0.0}
+
+
+def get_snapshot(path=SNAPSHOT_FILE):
+    """
+    Current snapshot for this process, remapped when the file has been
+    replaced. The file is stat'ed at most every SNAPSHOT_CHECK_INTERVAL_S.
+    Returns None if no snapshot exists.
+    """
+    now = time.monotonic()
+    with _lock:
+        if now - _current["checked_at"] < SNAPSHOT_CHECK_INTERVAL_S:
+            return _current["snapshot"]
+        _current["checked_at"] = now
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            _current["snapshot"] = None
+            return None
+
+        snapshot = _current["snapshot"]
+        if snapshot is None or snapshot.identity != (stat.st_ino, stat.st_mtime_ns):
+            try:
+                # The old mapping stays valid for requests still reading it
+                _current["snapshot"] = ReportSnapshot(path)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not map report snapshot - {e}")
+        return _current["snapshot"]
+
+
+def main():
+    """CLI Entry point"""
+    print("📦 Building report snapshot...")
+    count = build_snapshot()
+    print(f"   ✓ {count} reports packed into {SNAPSHOT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Compact columnar review storage shared by the scorer, AI analyzer and report
+
+Reviews are kept as parallel lists (one per field) with interned source
+labels, and each text is lowercased and whitespace-normalized once on
+ingest. Consumers read through ReviewView slices, which reference the
+batch's lists instead of copying reviews.
+"""
+import sys
+from itertools import islice
+
+REDDIT = sys.intern("Reddit")
+
+
+def normalize_review_text(text):
+    """Lowercase and collapse whitespace so keyword matching is done on clean text"""
+    return " ".join((text or "").lower().split())
+
+
+class ReviewView:
+    """Read-only window [start, stop) over a ReviewBatch; holds no review data itself"""
+
+    __slots__ = ("batch", "start", "stop")
+
+    def __init__(self, batch, start, stop):
+        self.batch = batch
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def _column(self, column):
+        return islice(column, self.start, self.stop)
+
+    def view(self, start=0, stop=None):
+        """Narrower view relative to this one"""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return ReviewView(self.batch, self.start + start, self.start + max(start, stop))
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            if item.step not in (None, 1):
+                raise ValueError("Review views only support contiguous slices")
+            return self.view(item.start or 0, item.stop)
+        index = range(self.start, self.stop)[item]
+        return self.batch.review_dict(index)
+
+    def __iter__(self):
+        for index in range(self.start, self.stop):
+            yield self.batch.review_dict(index)
+
+    def normalized_texts(self):
+        """Lowercased, whitespace-normalized texts for keyword scanning"""
+        return self._column(self.batch.normalized)
+
+    def prompt_lines(self, width=150):
+        """One "[source] rating/5 - text" line per review for the LLM prompt"""
+        batch = self.batch
+        for index in range(self.start, self.stop):
+            rating = batch.ratings[index]
+            yield f"[{batch.sources[index]}] {'N/A' if rating is None else rating}/5 - {batch.texts[index][:width]}"
+
+    def to_dicts(self):
+        """Plain review dicts for JSON serialization"""
+        return list(self)
+
+
+class ReviewBatch:
+    """All reviews for one analysis, stored column-wise"""
+
+    __slots__ = ("sources", "texts", "normalized", "ratings", "dates", "authors", "links")
+
+    def __init__(self):
+        self.sources = []
+        self.texts = []
+        self.normalized = []
+        self.ratings = []
+        self.dates = []
+        self.authors = []
+        self.links = []
+
+    def __len__(self):
+        return len(self.texts)
+
+    def view(self, start=0, stop=None):
+        """Zero-copy view over reviews [start, stop)"""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return ReviewView(self, start, max(start, stop))
+
+    def __getitem__(self, item):
+        return self.view()[item]
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def normalized_texts(self):
+        return iter(self.normalized)
+
+    def prompt_lines(self, width=150):
+        return self.view().prompt_lines(width)
+
+    def to_dicts(self):
+        return self.view().to_dicts()
+
+    def append(self, source, text, rating=None, date=None, author=None, link=None):
+        """Add one review; its text is normalized here, once"""
+        text = text or ""
+        self.sources.append(sys.intern(source))
+        self.texts.append(text)
+        self.normalized.append(normalize_review_text(text))
+        self.ratings.append(rating)
+        self.dates.append(date)
+        self.authors.append(author)
+        self.links.append(link)
+
+    def review_dict(self, index):
+        """Review at index as a dict, omitting fields the source doesn't have"""
+        review = {"source": self.sources[index], "text": self.texts[index]}
+        for key, column in (("rating", self.ratings), ("date", self.dates),
+                            ("author", self.authors), ("link", self.links)):
+            value = column[index]
+            if value is not None:
+                review[key] = value
+        return review
+
+    def extend_dicts(self, reviews):
+        """Add reviews in the fetchers' dict shape"""
+        for r in reviews:
+            self.append(r.get("source", ""), r.get("text", ""), rating=r.get("rating"),
+                        date=r.get("date"), author=r.get("author"), link=r.get("link"))
+
+    def extend_reddit(self, reddit_reviews):
+        """Add Reddit posts, joining title and snippet into the review text"""
+        for post in reddit_reviews:
+            self.append(REDDIT, f"{post['title']} - {post['snippet']}", link=post["link"])
+
+    @classmethod
+    def from_sources(cls, google_reviews, twitter_reviews, reddit_reviews):
+        """Build the combined batch in the order Google Maps, Twitter/X, Reddit"""
+        batch = cls()
+        batch.extend_dicts(google_reviews)
+        batch.extend_dicts(twitter_reviews)
+        batch.extend_reddit(reddit_reviews)
+        return batch
+
+
+def iter_normalized_texts(reviews):
+    """Normalized texts from a ReviewBatch/ReviewView or a list of review dicts"""
+    if isinstance(reviews, (ReviewBatch, ReviewView)):
+        return reviews.normalized_texts()
+    return (normalize_review_text(r.get("text", "")) for r in reviews)
+
+
+def keyword_hits(reviews, keywords):
+    """Number of reviews mentioning each keyword"""
+    hits = dict.fromkeys(keywords, 0)
+    for text in iter_normalized_texts(reviews):
+        for keyword in keywords:
+            if keyword in text:
+                hits[keyword] += 1
+    return hits
+
+
+def review_prompt_lines(reviews, limit, width=150):
+    """Prompt lines for the first `limit` reviews of a ReviewBatch/ReviewView or list of dicts"""
+    if isinstance(reviews, (ReviewBatch, ReviewView)):
+        return list(reviews.view(0, limit).prompt_lines(width))
+    return [
+        f"[{r['source']}] {r.get('rating', 'N/A')}/5 - {r['text'][:width]}"
+        for r in reviews[:limit]
+    ]
+
+
+def review_dicts(reviews, limit):
+    """Plain dicts for the first `limit` reviews, for serialization"""
+    if isinstance(reviews, (ReviewBatch, ReviewView)):
+        return reviews.view(0, limit).to_dicts()
+    return reviews[:limit]
@@ -2,6 +2,7 @@
 Safety score calculation logic
 """
 from config import *
+from reviews import iter_normalized_texts
 
 
 def calculate_safety_score(place_data, all_reviews, infrastructure):
@@ -24,29 +25,10 @@ def calculate_safety_score(place_data, all_reviews, infrastructure):
     score -= penalty
     
     # Infrastructure impact
-    score += min(
-        infrastructure["street_lights"] * INFRASTRUCTURE_WEIGHTS["street_light"], 
-        MAX_STREET_LIGHT_SCORE
-    )
-    score += min(
-        infrastructure["police_stations"] * INFRASTRUCTURE_WEIGHTS["police_station"], 
-        MAX_POLICE_SCORE
-    )
-    score += min(
-        infrastructure["hospitals"] * INFRASTRUCTURE_WEIGHTS["hospital"], 
-        MAX_HOSPITAL_SCORE
-    )
-    score += min(
-        infrastructure["fire_stations"] * INFRASTRUCTURE_WEIGHTS["fire_station"], 
-        MAX_FIRE_STATION_SCORE
-    )
+    score += sum(get_infrastructure_subscores(infrastructure).values())
     
     # Road connectivity (crowd proxy)
-    roads = infrastructure["roads_nearby"]
-    if roads > 20:
-        score += 10
-    elif roads < 5:
-        score -= 10
+    score += get_road_adjustment(infrastructure["roads_nearby"])
     
     # Ensure score is within 0-100 range
     score = max(0, min(100, score))
@@ -54,12 +36,43 @@ def calculate_safety_score(place_data, all_reviews, infrastructure):
     return score, negative_hits
 
 
+def get_infrastructure_subscores(infrastructure):
+    """Capped score contribution of each infrastructure type"""
+    return {
+        "street_lights": min(
+            infrastructure["street_lights"] * INFRASTRUCTURE_WEIGHTS["street_light"],
+            MAX_STREET_LIGHT_SCORE
+        ),
+        "police_stations": min(
+            infrastructure["police_stations"] * INFRASTRUCTURE_WEIGHTS["police_station"],
+            MAX_POLICE_SCORE
+        ),
+        "hospitals": min(
+            infrastructure["hospitals"] * INFRASTRUCTURE_WEIGHTS["hospital"],
+            MAX_HOSPITAL_SCORE
+        ),
+        "fire_stations": min(
+            infrastructure["fire_stations"] * INFRASTRUCTURE_WEIGHTS["fire_station"],
+            MAX_FIRE_STATION_SCORE
+        )
+    }
+
+
+def get_road_adjustment(roads):
+    """Score adjustment for road connectivity (crowd proxy)"""
+    if roads > 20:
+        return 10
+    elif roads < 5:
+        return -10
+    return 0
+
+
 def count_negative_reviews(all_reviews):
     """Count reviews containing negative safety keywords"""
     negative_count = 0
     
-    for review in all_reviews:
-        text = review.get("text", "").lower()
+    # Texts come pre-lowercased from a ReviewBatch
+    for text in iter_normalized_texts(all_reviews):
         if any(keyword in text for keyword in NEGATIVE_KEYWORDS):
             negative_count += 1
     
@@ -96,12 +109,7 @@ def get_detailed_breakdown(score, place_data, infrastructure, negative_hits):
         breakdown["rating_bonus"] = RATING_WEIGHTS["poor"]
     
     # Infrastructure bonus
-    infra_score = 0
-    infra_score += min(infrastructure["street_lights"] * INFRASTRUCTURE_WEIGHTS["street_light"], MAX_STREET_LIGHT_SCORE)
-    infra_score += min(infrastructure["police_stations"] * INFRASTRUCTURE_WEIGHTS["police_station"], MAX_POLICE_SCORE)
-    infra_score += min(infrastructure["hospitals"] * INFRASTRUCTURE_WEIGHTS["hospital"], MAX_HOSPITAL_SCORE)
-    infra_score += min(infrastructure["fire_stations"] * INFRASTRUCTURE_WEIGHTS["fire_station"], MAX_FIRE_STATION_SCORE)
-    breakdown["infrastructure_bonus"] = infra_score
+    breakdown["infrastructure_bonus"] = sum(get_infrastructure_subscores(infrastructure).values())
     
     # Negative penalty
     breakdown["negative_penalty"] = min(negative_hits * NEGATIVE_REVIEW_PENALTY_PER_HIT, MAX_NEGATIVE_REVIEW_PENALTY)
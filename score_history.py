@@ -0,0 +1,394 @@
+"""
+Append-only columnar history of safety scores
+
+Every analysis appends one row per hotel: timestamp, score, sub-scores,
+per-keyword negative review hits and the AI assessment. Each column is a
+flat binary file of fixed-width values, so reads memory-map the files and
+scan typed memoryviews without parsing. A change detector compares a recent
+window against a baseline window and flags significant score drops and
+keyword surges (e.g. a burst of "theft" reviews).
+"""
+import json
+import math
+import mmap
+import operator
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from name_index import normalize_name
+from reviews import keyword_hits
+from config import (
+    HISTORY_DIR, NEGATIVE_KEYWORDS,
+    CHANGE_RECENT_DAYS, CHANGE_BASELINE_DAYS, CHANGE_MIN_SCORE_DROP, CHANGE_Z_THRESHOLD
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+# column name -> array typecode
+COLUMNS = {
+    "ts": "d",
+    "hotel": "I",
+    "score": "B",
+    "rating_bonus": "b",
+    "infrastructure_bonus": "B",
+    "negative_penalty": "B",
+    "negative_hits": "H",
+    "ai_assessment": "B",
+    "ai_confidence": "B",
+}
+ASSESSMENTS = ["Unknown", "Safe", "Moderate", "Unsafe", "Error"]
+DAY_S = 86400
+
+
+def _clamp(value, low, high):
+    try:
+        return max(low, min(high, int(value)))
+    except (TypeError, ValueError):
+        return low
+
+
+def hotel_history_key(place_data):
+    """Stable identity of a hotel across runs: its data_id, else its normalized name"""
+    return place_data.get("data_id") or normalize_name(place_data.get("name"))
+
+
+class HistoryStore:
+    """Columnar score history in a directory of append-only column files"""
+
+    def __init__(self, path=HISTORY_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        schema_path = os.path.join(path, "schema.json")
+        if os.path.exists(schema_path):
+            with open(schema_path, encoding="utf-8") as f:
+                self.keywords = json.load(f)["keywords"]
+        else:
+            self.keywords = list(NEGATIVE_KEYWORDS)
+            with open(schema_path, "w", encoding="utf-8") as f:
+                json.dump({"keywords": self.keywords}, f)
+
+        self.columns = dict(COLUMNS)
+        for i in range(len(self.keywords)):
+            self.columns[f"kw_{i}"] = "H"
+
+        self._hotel_ids = {}
+        self._hotel_names = []
+        self._keys_by_name = {}  # normalized stored name -> [hotel_key]
+        self._hotels_offset = 0
+        self._rows_by_hotel = {}
+        self._indexed_rows = 0
+
+    # ---------- writing ----------
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f"{name}.col")
+
+    @contextmanager
+    def _file_lock(self):
+        with open(os.path.join(self.path, ".lock"), "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_hotels(self):
+        """Read hotel dictionary entries appended since the last call (other processes too)"""
+        hotels_path = os.path.join(self.path, "hotels.jsonl")
+        if not os.path.exists(hotels_path):
+            return
+        with open(hotels_path, encoding="utf-8") as f:
+            f.seek(self._hotels_offset)
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # Partially written, pick it up next time
+                entry = json.loads(line)
+                self._hotel_ids[entry["key"]] = entry["id"]
+                self._hotel_names.append(entry["name"])
+                self._keys_by_name.setdefault(normalize_name(entry["name"]), []).append(entry["key"])
+                self._hotels_offset += len(line.encode("utf-8"))
+
+    def _hotel_id(self, key, name):
+        self._load_hotels()
+        if key not in self._hotel_ids:
+            hotel_id = len(self._hotel_names)
+            with open(os.path.join(self.path, "hotels.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps({"id": hotel_id, "key": key, "name": name}, ensure_ascii=False) + "\n")
+            self._load_hotels()
+        return self._hotel_ids[key]
+
+    def _column_rows(self):
+        """Complete rows in the shortest column file"""
+        rows = []
+        for column, typecode in self.columns.items():
+            path = self._column_path(column)
+            rows.append((os.path.getsize(path) if os.path.exists(path) else 0) // array(typecode).itemsize)
+        return min(rows)
+
+    def _committed_rows(self):
+        """
+        Rows fully written by append(). Stores created before the row count
+        was kept fall back to the shortest column.
+        """
+        try:
+            with open(os.path.join(self.path, "rows.count"), "rb") as f:
+                return int.from_bytes(f.read(), "little")
+        except FileNotFoundError:
+            return self._column_rows()
+
+    def _commit_rows(self, rows):
+        """Publish a new row count; readers never look past it"""
+        count_path = os.path.join(self.path, "rows.count")
+        tmp_path = f"{count_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(rows.to_bytes(8, "little"))
+        os.replace(tmp_path, count_path)
+
+    def _repair_partial_row(self):
+        """Truncate column data past the committed row count, left by a crash mid-append"""
+        rows = self._committed_rows()
+        for column, typecode in self.columns.items():
+            path = self._column_path(column)
+            expected = rows * array(typecode).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > expected:
+                os.truncate(path, expected)
+        return rows
+
+    def append(self, report, hotel_key, hits, ts=None):
+        """Append one row for a finished report"""
+        breakdown = report.get("score_breakdown", {})
+        ai_analysis = report.get("ai_analysis", {})
+        assessment = ai_analysis.get("assessment")
+        values = {
+            "score": _clamp(report.get("safety_score"), 0, 255),
+            "rating_bonus": _clamp(breakdown.get("rating_bonus"), -128, 127),
+            "infrastructure_bonus": _clamp(breakdown.get("infrastructure_bonus"), 0, 255),
+            "negative_penalty": _clamp(breakdown.get("negative_penalty"), 0, 255),
+            "negative_hits": _clamp(report.get("negative_review_count"), 0, 0xFFFF),
+            "ai_assessment": ASSESSMENTS.index(assessment) if assessment in ASSESSMENTS else 0,
+            "ai_confidence": _clamp(ai_analysis.get("confidence_score"), 0, 255),
+        }
+        for i, keyword in enumerate(self.keywords):
+            values[f"kw_{i}"] = _clamp(hits.get(keyword, 0), 0, 0xFFFF)
+
+        name = report.get("hotel_info", {}).get("name") or hotel_key
+        with self._lock, self._file_lock():
+            values["hotel"] = self._hotel_id(hotel_key, name)
+            # Timestamp taken under the lock so rows stay in time order across processes
+            values["ts"] = ts or time.time()
+            rows = self._repair_partial_row()
+            # Append every column, then commit the row count; readers stop at
+            # the committed count, so a crash mid-row never exposes a partial row
+            for column, typecode in self.columns.items():
+                with open(self._column_path(column), "ab") as f:
+                    f.write(array(typecode, [values[column]]).tobytes())
+            self._commit_rows(rows + 1)
+
+    # ---------- reading ----------
+
+    def _views(self, names):
+        """Memory-map the requested columns; returns ({name: memoryview}, committed row count)"""
+        # Read the count before mapping so every mapped column covers it
+        committed = self._committed_rows()
+        views = {}
+        for name in names:
+            path = self._column_path(name)
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                return {}, 0
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            typecode = self.columns[name]
+            size = array(typecode).itemsize
+            views[name] = memoryview(mm)[:len(mm) - len(mm) % size].cast(typecode)
+        rows = min([committed] + [len(view) for view in views.values()])
+        return views, rows
+
+    def _time_range(self, ts, rows, since, until):
+        """Row range [lo, hi) with since <= ts <= until (rows are appended in time order)"""
+        lo = bisect_left(ts, since, 0, rows) if since is not None else 0
+        hi = bisect_right(ts, until, 0, rows) if until is not None else rows
+        return lo, hi
+
+    def _index(self, hotel_column, rows):
+        """Row numbers per hotel, extended incrementally as rows are appended"""
+        if rows > self._indexed_rows:
+            index = self._rows_by_hotel
+            for row, hotel in zip(range(self._indexed_rows, rows), hotel_column[self._indexed_rows:rows]):
+                hotel_rows = index.get(hotel)
+                if hotel_rows is None:
+                    hotel_rows = index[hotel] = array("I")
+                hotel_rows.append(row)
+            self._indexed_rows = rows
+        return self._rows_by_hotel
+
+    def _snapshot(self, columns):
+        """Mapped columns, row count, per-hotel row index and hotel dictionary for a query"""
+        with self._lock:
+            self._load_hotels()
+            views, rows = self._views(set(columns) | {"ts", "hotel"})
+            index = self._index(views["hotel"], rows) if rows else {}
+            keys = {hotel_id: key for key, hotel_id in self._hotel_ids.items()}
+            return views, rows, index, keys, list(self._hotel_names)
+
+    def resolve_hotel(self, hotel):
+        """
+        [(history key, name)] matching a data_id/key or a hotel name (compared
+        with the names stored in hotels.jsonl). More than one match means the
+        name is ambiguous.
+        """
+        with self._lock:
+            self._load_hotels()
+            keys = [hotel] if hotel in self._hotel_ids else self._keys_by_name.get(normalize_name(hotel), [])
+            return [(key, self._hotel_names[self._hotel_ids[key]]) for key in keys]
+
+    def hotel_series(self, hotel_key, since=None, until=None, columns=("ts", "score")):
+        """Column values for one hotel between two timestamps, as {column: list}"""
+        views, rows, index, _, _ = self._snapshot(columns)
+        hotel_id = self._hotel_ids.get(hotel_key)
+        if hotel_id not in index:
+            return {column: [] for column in columns}
+
+        lo, hi = self._time_range(views["ts"], rows, since, until)
+        hotel_rows = index[hotel_id]
+        selected = hotel_rows[bisect_left(hotel_rows, lo):bisect_left(hotel_rows, hi)]
+        return {column: list(map(views[column].__getitem__, selected)) for column in columns}
+
+    def rolling_mean(self, hotel_key, column="score", window_s=7 * DAY_S, since=None):
+        """[(ts, mean of column over the trailing window)] for one hotel"""
+        series = self.hotel_series(hotel_key, since=since, columns=("ts", column))
+        ts, values = series["ts"], series[column]
+        result, total, start = [], 0, 0
+        for i, value in enumerate(values):
+            total += value
+            while ts[start] < ts[i] - window_s:
+                total -= values[start]
+                start += 1
+            result.append((ts[i], total / (i - start + 1)))
+        return result
+
+    def aggregate(self, since=None, until=None):
+        """
+        Per-hotel aggregates over a time range for all hotels:
+        {hotel_key: {"name", "runs", "mean_score", "min_score", "last_score"}}
+        """
+        views, rows, index, keys, names = self._snapshot(("score",))
+        if not rows:
+            return {}
+
+        lo, hi = self._time_range(views["ts"], rows, since, until)
+        score = views["score"]
+        result = {}
+        for hotel, hotel_rows in index.items():
+            selected = hotel_rows[bisect_left(hotel_rows, lo):bisect_left(hotel_rows, hi)]
+            if not selected:
+                continue
+            scores = list(map(score.__getitem__, selected))
+            result[keys[hotel]] = {
+                "name": names[hotel],
+                "runs": len(scores),
+                "mean_score": round(sum(scores) / len(scores), 2),
+                "min_score": min(scores),
+                "last_score": scores[-1]
+            }
+        return result
+
+    def detect_changes(self, now=None, recent_days=CHANGE_RECENT_DAYS, baseline_days=CHANGE_BASELINE_DAYS,
+                       min_drop=CHANGE_MIN_SCORE_DROP, z_threshold=CHANGE_Z_THRESHOLD):
+        """
+        Compare each hotel's recent window with the baseline window before it.
+        Flags score drops that are both large (>= min_drop points) and
+        significant (Welch z >= z_threshold), and keyword hit surges whose
+        Poisson z-score against the baseline rate exceeds z_threshold.
+        """
+        now = now or time.time()
+        recent_start = now - recent_days * DAY_S
+        baseline_start = recent_start - baseline_days * DAY_S
+        keyword_columns = [f"kw_{i}" for i in range(len(self.keywords))]
+
+        views, rows, index, keys, names = self._snapshot(["score"] + keyword_columns)
+        if not rows:
+            return []
+
+        ts, score = views["ts"], views["score"]
+        base_lo, mid = self._time_range(ts, rows, baseline_start, recent_start)
+        _, recent_hi = self._time_range(ts, rows, None, now)
+
+        changes = []
+        for hotel, hotel_rows in index.items():
+            first = bisect_left(hotel_rows, base_lo)
+            split = bisect_left(hotel_rows, mid)
+            last = bisect_left(hotel_rows, recent_hi)
+            base_rows, recent_rows = hotel_rows[first:split], hotel_rows[split:last]
+            if len(base_rows) < 2 or not recent_rows:
+                continue
+            flags = []
+
+            base = list(map(score.__getitem__, base_rows))
+            recent = list(map(score.__getitem__, recent_rows))
+            base_mean, recent_mean = sum(base) / len(base), sum(recent) / len(recent)
+            drop = base_mean - recent_mean
+            variance = _variance(base) / len(base) + _variance(recent) / len(recent)
+            z = drop / math.sqrt(variance) if variance > 0 else (math.inf if drop > 0 else 0)
+            if drop >= min_drop and z >= z_threshold:
+                flags.append({"type": "score_drop", "baseline_mean": round(base_mean, 2),
+                              "recent_mean": round(recent_mean, 2), "z": round(min(z, 1e6), 2)})
+
+            for i, keyword in enumerate(self.keywords):
+                column = views[f"kw_{i}"]
+                recent_hits = sum(map(column.__getitem__, recent_rows))
+                if recent_hits < 3:
+                    continue  # Too few hits to call a surge; skip the baseline scan
+                base_hits = sum(map(column.__getitem__, base_rows))
+                # Add-one smoothing so a keyword never seen before can still surge
+                expected = (base_hits + 1) / len(base_rows) * len(recent_rows)
+                z = (recent_hits - expected) / math.sqrt(expected)
+                if z >= z_threshold:
+                    flags.append({"type": "keyword_surge", "keyword": keyword,
+                                  "baseline_hits": base_hits, "recent_hits": recent_hits, "z": round(z, 2)})
+
+            if flags:
+                changes.append({"hotel": keys[hotel], "name": names[hotel], "changes": flags})
+
+        return changes
+
+
+def _variance(values):
+    """Sample variance (0 for fewer than two values)"""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    total = sum(values)
+    return max(0.0, (sum(map(operator.mul, values, values)) - total * total / n) / (n - 1))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Process-wide history store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
+
+
+def record_report(report, all_reviews):
+    """Append a finished report to the history; failures are logged, never raised"""
+    try:
+        store = get_history_store()
+        hits = keyword_hits(all_reviews, store.keywords)
+        store.append(report, hotel_history_key(report.get("hotel_info", {})), hits)
+    except Exception as e:
+        print(f"Warning: Could not record score history - {e}")
@@ -1,7 +1,17 @@
-from flask import Flask, request, jsonify
+import time
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from main import run_analysis
-from config import LOCATION as DEFAULT_LOCATION
+from area_ranking import rank_area
+from infra_grid import load_grid, tile_bounds
+from report_cache import get_cached_report, cache_report, cached_at
+from report_snapshot import get_snapshot
+from refresh_scheduler import scheduler
+from score_history import get_history_store
+from config import (
+    LOCATION as DEFAULT_LOCATION, AREA_RANKING_TOP_K, AREA_RANKING_MAX_TOP_K,
+    REFRESH_SCHEDULER_ENABLED, REPORT_CACHE_TTL_S, SNAPSHOT_CLOCK_SLACK_S
+)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -26,19 +36,118 @@ def analyze():
     # But let's check if the user provided location bias.
     location = data.get('location', DEFAULT_LOCATION)
     
+    # Started lazily so only the process actually serving requests runs it
+    # (not the debug reloader parent)
+    if REFRESH_SCHEDULER_ENABLED:
+        scheduler.start()
+        scheduler.record_request(hotel_name, location)
+    
+    # Shared snapshot first: pre-serialized bytes, no JSON encoding needed.
+    # Skip it when the cache holds a newer report (e.g. a background refresh).
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        hit = snapshot.get_by_name(hotel_name, location)
+        if hit and time.time() - hit[1] < REPORT_CACHE_TTL_S:
+            cache_time = cached_at(hotel_name, location)
+            if cache_time is None or cache_time <= hit[1] + SNAPSHOT_CLOCK_SLACK_S:
+                return Response(hit[0], status=200, mimetype="application/json")
+    
+    cached = get_cached_report(hotel_name, location)
+    if cached is not None:
+        return jsonify(cached), 200
+    
     try:
         # Run analysis
         report = run_analysis(query=hotel_name, location_bias=location)
         
         if "error" in report:
             return jsonify(report), 500
-            
+        
+        cache_report(hotel_name, location, report)
         return jsonify(report), 200
         
     except Exception as e:
         print(f"Server Error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/rank', methods=['POST'])
+def rank():
+    data = request.get_json()
+    
+    if not data or 'query' not in data:
+        return jsonify({"error": "Missing query"}), 400
+    
+    location = data.get('location', DEFAULT_LOCATION)
+    try:
+        top_k = int(data.get('top_k', AREA_RANKING_TOP_K))
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_k must be an integer"}), 400
+    if not 0 <= top_k <= AREA_RANKING_MAX_TOP_K:
+        return jsonify({"error": f"top_k must be between 0 and {AREA_RANKING_MAX_TOP_K}"}), 400
+    
+    try:
+        ranking = rank_area(data['query'], location_bias=location, top_k=top_k)
+        
+        if "error" in ranking:
+            return jsonify(ranking), 500
+            
+        return jsonify(ranking), 200
+        
+    except Exception as e:
+        print(f"Server Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/heatmap/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def heatmap_tile(z, x, y):
+    grid = load_grid()
+    if grid is None:
+        return jsonify({"error": "Infrastructure grid not available"}), 404
+    
+    tile = grid.tile(*tile_bounds(z, x, y))
+    if tile is None:
+        return jsonify({"error": "Tile outside infrastructure grid"}), 404
+    
+    return jsonify(tile), 200
+
+@app.route('/api/history', methods=['GET'])
+def history():
+    hotel = request.args.get('hotel')
+    if not hotel:
+        return jsonify({"error": "Missing hotel"}), 400
+    
+    try:
+        days = float(request.args.get('days', 90))
+    except ValueError:
+        return jsonify({"error": "days must be a number"}), 400
+    
+    store = get_history_store()
+    # Accept either a data_id or a hotel name
+    matches = store.resolve_hotel(hotel)
+    if len(matches) > 1:
+        return jsonify({
+            "error": "Ambiguous hotel name, pass a data_id",
+            "matches": [{"hotel": key, "name": name} for key, name in matches]
+        }), 409
+    
+    columns = ("ts", "score", "ai_confidence")
+    if not matches:
+        return jsonify({column: [] for column in columns}), 200
+    series = store.hotel_series(matches[0][0], since=time.time() - days * 86400, columns=columns)
+    return jsonify(series), 200
+
+@app.route('/api/history/summary', methods=['GET'])
+def history_summary():
+    try:
+        days = float(request.args.get('days', 90))
+    except ValueError:
+        return jsonify({"error": "days must be a number"}), 400
+    
+    return jsonify(get_history_store().aggregate(since=time.time() - days * 86400)), 200
+
+@app.route('/api/history/changes', methods=['GET'])
+def history_changes():
+    return jsonify(get_history_store().detect_changes()), 200
+
 if __name__ == '__main__':
     port = 5001
     print(f"🔥 Server starting on http://localhost:{port}")
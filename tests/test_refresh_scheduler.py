@@ -0,0 +1,61 @@
+"""
+Refresh scheduler: bounded popularity tracking and counts shared by workers
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import refresh_scheduler
+from config import REFRESH_POPULARITY_MAX_ENTRIES, REFRESH_POPULARITY_SWEEP_EVERY
+from refresh_scheduler import RefreshScheduler
+
+
+class PopularityTest(unittest.TestCase):
+
+    def test_unique_names_do_not_grow_the_table(self):
+        scheduler = RefreshScheduler()
+        for _ in range(5):
+            scheduler.record_request("Radisson Blu Pune Kharadi", "@18.56,73.94,14z")
+
+        # Every request names a different hotel, as a scraper or a fuzzing client would
+        for i in range(20 * REFRESH_POPULARITY_MAX_ENTRIES):
+            scheduler.record_request(f"Hotel {i}")
+
+        self.assertLessEqual(len(scheduler._popularity),
+                             REFRESH_POPULARITY_MAX_ENTRIES + REFRESH_POPULARITY_SWEEP_EVERY)
+        self.assertEqual(scheduler.hottest(1)[0][2], "Radisson Blu Pune Kharadi")
+
+
+class SharedPopularityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix="popularity_test_")
+        patcher = mock.patch.object(refresh_scheduler, "REFRESH_POPULARITY_DIR", self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.path, True)
+
+    def test_leader_adds_follower_counts(self):
+        leader, follower = RefreshScheduler(), RefreshScheduler()
+        leader._is_leader = True
+        # Both live in this process; give the follower another worker's file
+        follower._flush_path = lambda: os.path.join(self.path, "follower.json")
+
+        leader.record_request("Hyatt Pune")
+        for _ in range(3):
+            follower.record_request("Hyatt Pune")
+            follower.record_request("Novotel Pune")
+        follower.record_request("Novotel Pune")
+        follower.flush_popularity()
+
+        hottest = {name: round(popularity, 3) for popularity, _, name, _ in leader.hottest()}
+        self.assertEqual(hottest, {"Hyatt Pune": 4, "Novotel Pune": 4})
+        # A follower only sees its own traffic
+        self.assertEqual(len(follower.hottest()), 2)
+        self.assertEqual(len(RefreshScheduler().hottest()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
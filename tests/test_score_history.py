@@ -0,0 +1,57 @@
+"""
+Score history: name lookups and crash-safe appends
+"""
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from score_history import HistoryStore
+
+
+def report(name, data_id, score):
+    return {
+        "hotel_info": {"name": name, "data_id": data_id},
+        "safety_score": score,
+        "score_breakdown": {},
+        "ai_analysis": {"assessment": "Safe", "confidence_score": 80}
+    }
+
+
+class HistoryStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix="history_test_")
+        self.store = HistoryStore(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def test_name_resolves_to_data_id_key(self):
+        self.store.append(report("Radisson Blu Pune Kharadi", "0xabc", 80), "0xabc", {})
+
+        self.assertEqual(self.store.resolve_hotel("radisson blu pune kharadi"),
+                         [("0xabc", "Radisson Blu Pune Kharadi")])
+        self.assertEqual(self.store.resolve_hotel("0xabc"), [("0xabc", "Radisson Blu Pune Kharadi")])
+        self.assertEqual(self.store.resolve_hotel("Unknown Hotel"), [])
+
+    def test_partial_row_is_never_visible(self):
+        self.store.append(report("Hotel A", "0xa", 80), "0xa", {})
+        reader = HistoryStore(self.path)
+
+        # A writer crashed after writing only some columns of the next row
+        for column, typecode, value in (("ts", "d", 2e9), ("hotel", "I", 0), ("score", "B", 10)):
+            with open(self.store._column_path(column), "ab") as f:
+                f.write(array(typecode, [value]).tobytes())
+
+        self.assertEqual(reader.hotel_series("0xa")["score"], [80])
+        self.assertEqual(reader.aggregate()["0xa"]["runs"], 1)
+
+        # The next append reuses that row number; the reader must not misattribute it
+        self.store.append(report("Hotel B", "0xb", 55), "0xb", {})
+        self.assertEqual(reader.hotel_series("0xa")["score"], [80])
+        self.assertEqual(reader.hotel_series("0xb")["score"], [55])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Upstream call accounting for the combined Twitter/X + Reddit search
+
+Run from the repository root:
+    python -m unittest discover -s tests
+"""
+import unittest
+from unittest import mock
+
+import data_fetchers
+from config import MAX_TWEETS, MAX_REDDIT_POSTS
+
+PER_PAGE = MAX_TWEETS + MAX_REDDIT_POSTS
+
+
+def tweet(i):
+    return {"title": f"guest{i} on X: nice stay", "snippet": f"tweet {i}",
+            "link": f"https://x.com/guest{i}/status/{i}"}
+
+
+def reddit_post(i):
+    return {"title": f"thread {i}", "snippet": f"post {i}",
+            "link": f"https://www.reddit.com/r/pune/comments/{i}"}
+
+
+class CountingGoogleSearch:
+    """Stands in for serpapi.GoogleSearch; serves canned pages and records every call"""
+
+    def __init__(self, pages):
+        self.pages = pages  # start offset -> organic results
+        self.calls = []
+
+    def __call__(self, params):
+        self.calls.append(dict(params))
+        return self
+
+    def get_dict(self):
+        params = self.calls[-1]
+        return {"organic_results": self.pages.get(params.get("start", 0), [])}
+
+
+class SocialSearchAccountingTest(unittest.TestCase):
+
+    def run_with(self, pages):
+        search = CountingGoogleSearch(pages)
+        with mock.patch.object(data_fetchers, "GoogleSearch", search):
+            twitter, reddit = data_fetchers.fetch_social_reviews("Radisson Blu Pune Kharadi")
+        return search, twitter, reddit
+
+    def test_one_combined_call_replaces_two(self):
+        # Separate Twitter/X and Reddit searches cost one call each
+        legacy_calls = 2
+        page = [tweet(i) for i in range(MAX_TWEETS)] + [reddit_post(i) for i in range(MAX_REDDIT_POSTS)]
+
+        search, twitter, reddit = self.run_with({0: page})
+
+        self.assertEqual(len(search.calls), 1)
+        self.assertLess(len(search.calls), legacy_calls)
+        self.assertEqual(len(twitter), MAX_TWEETS)
+        self.assertEqual(len(reddit), MAX_REDDIT_POSTS)
+        self.assertIn("hotel", search.calls[0]["q"].split())
+
+    def test_second_page_only_while_a_quota_is_unfilled(self):
+        # A full first page that is almost all tweets leaves the Reddit quota short
+        first = [tweet(i) for i in range(PER_PAGE - 5)] + [reddit_post(i) for i in range(5)]
+        second = [reddit_post(i) for i in range(5, 5 + PER_PAGE)]
+
+        search, twitter, reddit = self.run_with({0: first, PER_PAGE: second})
+
+        self.assertEqual([call["start"] for call in search.calls], [0, PER_PAGE])
+        self.assertEqual(len(twitter), MAX_TWEETS)
+        self.assertEqual(len(reddit), MAX_REDDIT_POSTS)
+
+    def test_short_page_stops_paging(self):
+        # Fewer results than requested means there is no next page to fetch
+        search, twitter, reddit = self.run_with({0: [tweet(0), reddit_post(0)]})
+
+        self.assertEqual(len(search.calls), 1)
+        self.assertEqual((len(twitter), len(reddit)), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()